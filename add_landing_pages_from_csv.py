@@ -2,13 +2,17 @@
 
 # Reads a csv file and adds a Volunteer Hub landing for each row, except the first row. The first row
 # is a header row, with the columns labeled:
-#	"name"
 #	"organization_name"
-#	"user_group_name"
+#	"user_group"
+#	"page_name"
 #	"event_group"
 #
-# All fields are required, except for event_group -- event_group
+# organization_name and user_group are required. page_name will be
+# generated from organization_name if omitted, and event_group
 # will default to "All Events" if omitted.
+#
+# The whole file is checked before the browser is started; if any
+# rows are bad, all of them are listed and nothing is done.
 # 
 # The easiest way to construct a suitable CSV file is to add the data to
 # a spreadsheet and then save the spreadsheet as a CSV file.
@@ -19,7 +23,9 @@
 # However, the match is case-insensitive -- in the CSV file you may use upper or lower case,
 # or any combination thereof, as desired.
 #
-# Uses built-in re and sys modules.
+# With --via-daemon, the job is run by vhdaemon.py instead.
+#
+# Uses built-in os.path and sys modules.
 #
 # Uses selenium (third party, available via PyPi)
 #
@@ -27,32 +33,60 @@
 #
 # This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
 
-import csv
 import os.path
-import re
 import sys
 
-from selenium.webdriver.support.ui import Select
-from fsvhub import LandingPageApi, VhBrowser
+from fsvhub import (LandingPageApi, VhBrowser,
+	CsvField, CsvSchema, CsvValidationError)
+from fsvhub.daemon import submit_job, via_daemon
 
+SCHEMA = CsvSchema([
+	CsvField('organization_name', required=True),
+	CsvField('user_group', required=True, references='user_group'),
+	CsvField('page_name'),
+	CsvField('event_group', default='All Events', references='event_group', also_allow=('All Events',)),
+	])
 
-if len(sys.argv) < 4:
-	print("Usage: {} username password inputfile".format(sys.argv[0]))
-	print("\tAny item containing spaces must be quoted.")
-	sys.exit(1)
-	
-user = sys.argv[1]
-password = sys.argv[2]
-input_filename = sys.argv[3]
 
-b = VhBrowser(user,password)
-api = LandingPageApi(b)
-
-with open(input_filename,'r') as infile:
-	reader = csv.DictReader(infile)
-	for row in reader:
+def run_job(b, args):
+	"""
+	Adds the landing pages in CSV file args[0], using VhBrowser b.
+	"""
+	input_filename = args[0]
+	# Check the whole file before using the browser:
+	try:
+		SCHEMA.check(input_filename, b.vr)
+	except CsvValidationError as e:
+		print(e.report())
+		# So the daemon reports the job as failed:
+		raise
+	api = LandingPageApi(b)
+	for line_number, row in SCHEMA.rows(input_filename):
 		print(row)
 		api.add_landing_page(row['organization_name'], row['user_group'],
-        page_name=row['page_name'], event_group=row['event_group'])
+			page_name=row['page_name'], event_group=row['event_group'])
+
+def main():
+	argv = via_daemon(sys.argv)
+	if len(argv or sys.argv) < 4:
+		print("Usage: {} [--via-daemon] username password inputfile".format(sys.argv[0]))
+		print("\tAny item containing spaces must be quoted.")
+		sys.exit(1)
+	if argv is not None:
+		ok = submit_job('add_landing_pages', argv[1], argv[2], [ os.path.abspath(argv[3]) ])
+		sys.exit(0 if ok else 1)
+	user = sys.argv[1]
+	password = sys.argv[2]
+	input_filename = sys.argv[3]
+	b = VhBrowser(user,password)
+	# (The browser isn't started until it's needed, after run_job()
+	# has checked the whole file.)
+	try:
+		run_job(b, [ input_filename ])
+	except CsvValidationError:
+		sys.exit(1)
+	finally:
+		b.logout()
 
-api.logout()
+if __name__ == '__main__':
+	main()
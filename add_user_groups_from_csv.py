@@ -9,6 +9,10 @@
 #	parent group name
 #	
 #   A third field, description, is optional.
+#
+#   The parent group must already exist, or be added by an earlier row.
+#   The whole file is checked before the browser is started; if any
+#   rows are bad, all of them are listed and nothing is done.
 # 
 # The easiest way to construct a suitable CSV file is to add the data to
 # a spreadsheet and then save the spreadsheet as a CSV file.
@@ -22,7 +26,9 @@
 # Read reservation expirations for VH events.
 # For each one, print event id and value of reservation expiration drop-down select.
 #
-# Uses built-in re and sys modules.
+# With --via-daemon, the job is run by vhdaemon.py instead.
+#
+# Uses built-in os.path and sys modules.
 #
 # Uses selenium (third party, available via PyPi)
 #
@@ -30,36 +36,60 @@
 #
 # This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
 
-import csv
 import os.path
-import re
 import sys
 
-from selenium.webdriver.support.ui import Select
-from fsvhub import UserGroupApi
-
-
+from fsvhub import (UserGroupApi, VhBrowser,
+	CsvField, CsvSchema, CsvValidationError)
+from fsvhub.daemon import submit_job, via_daemon
 
+SCHEMA = CsvSchema([
+	CsvField('name', required=True, creates='user_group'),
+	CsvField('parent_name', required=True, references='user_group'),
+	CsvField('description'),
+	])
 
-if len(sys.argv) < 4:
-	print("Usage: {} username password inputfile".format(sys.argv[0]))
-	print("\tAny item containing spaces must be quoted.")
-	sys.exit(1)
-	
-user = sys.argv[1]
-password = sys.argv[2]
-input_filename = sys.argv[3]
 
-
-
-group_api = UserGroupApi(user,password)
-
-with open(input_filename,'r') as infile:
-	reader = csv.DictReader(infile)
-	for row in reader:
+def run_job(b, args):
+	"""
+	Adds the user groups in CSV file args[0], using VhBrowser b.
+	"""
+	input_filename = args[0]
+	# Check the whole file before using the browser:
+	try:
+		SCHEMA.check(input_filename, b.vr)
+	except CsvValidationError as e:
+		print(e.report())
+		# So the daemon reports the job as failed:
+		raise
+	group_api = UserGroupApi(b)
+	for line_number, row in SCHEMA.rows(input_filename):
 		print(row)
 		res = group_api.add_group(row['name'],
 				 description=row['description'], parent_name=row['parent_name'])
 		print(res)
 
-group_api.logout()
+def main():
+	argv = via_daemon(sys.argv)
+	if len(argv or sys.argv) < 4:
+		print("Usage: {} [--via-daemon] username password inputfile".format(sys.argv[0]))
+		print("\tAny item containing spaces must be quoted.")
+		sys.exit(1)
+	if argv is not None:
+		ok = submit_job('add_user_groups', argv[1], argv[2], [ os.path.abspath(argv[3]) ])
+		sys.exit(0 if ok else 1)
+	user = sys.argv[1]
+	password = sys.argv[2]
+	input_filename = sys.argv[3]
+	b = VhBrowser(user,password)
+	# (The browser isn't started until it's needed, after run_job()
+	# has checked the whole file.)
+	try:
+		run_job(b, [ input_filename ])
+	except CsvValidationError:
+		sys.exit(1)
+	finally:
+		b.logout()
+
+if __name__ == '__main__':
+	main()
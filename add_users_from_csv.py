@@ -24,6 +24,10 @@
 #	* lp_name (may be blank; if so, will be generated from user_group)
 #	* lp_exists ('1', 'Y', 'y', 'yes', 'Yes', 'YES', etc. will mean True. Anything else means False)
 #
+# The whole file is checked before the browser is started. If any rows
+# are bad (missing required fields, phone numbers without ten digits,
+# unknown groups), all of them are listed and nothing is done.
+#
 
 
 #	a list of groups names, separated by commas; for example, 
@@ -41,36 +45,44 @@
 # or any combination thereof, as desired.
 #
 #
+# With --via-daemon, the job is run by vhdaemon.py instead.
+#
 # Uses selenium (third party, available via PyPi)
 #
 # Uses fsvhub and config file vhconfig.cfg
 #
 # This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
 
-import csv
 import os.path
-import re
 import sys
 
-from selenium.webdriver.support.ui import Select
-from fsvhub import UserApi, UserGroupApi, LandingPageApi
+from fsvhub import (UserApi, UserGroupApi, VhBrowser,
+	CsvField, CsvSchema, CsvValidationError)
+from fsvhub.daemon import submit_job, via_daemon
+
+SCHEMA = CsvSchema([
+	CsvField('user_group', required=True, creates='user_group'),
+	CsvField('parent_group', required=True, creates='user_group'),
+	CsvField('grandparent_group', required=True, references='user_group'),
+	CsvField('event_group', required=True, references='event_group', also_allow=('All Events',)),
+	CsvField('leader_fname', required=True),
+	CsvField('leader_lname', required=True),
+	CsvField('leader_username'),
+	CsvField('leader_password', required=True),
+	CsvField('leader_cell', kind='phone'),
+	CsvField('leader_home', kind='phone'),
+	CsvField('leader_email'),
+	CsvField('leader_groups', kind='list', references='user_group'),
+	CsvField('lp_name'),
+	CsvField('lp_exists', kind='flag'),
+	])
 
 
 def parse_row(row):
-	# verify required fields present
-	req_fields = [ 
-				'user_group', 'parent_group', 'grandparent_group', 'event_group',
-					'leader_fname','leader_lname','leader_password'
-				]
-	for f in req_fields:
-		if row.get(f,'').strip() == '':
-			raise Exception("Required field {} not present".format(f))
+	# row has already been validated and normalized by SCHEMA.
 	# generate group list, if not explicitly given:
-	s = row.get('leader_groups','').strip()
-	if s == '':
+	if not row['leader_groups']:
 		row['leader_groups'] = [ 'Team Leaders', row['user_group'] ]
-	else:
-		row['leader_groups'] = s.split(',')
 	# generate user group description:
 	row['user_group_description'] = "{} 2016. Contact {} {}. Phone {}. Email {}".format(
 			row['event_group'], row['leader_fname'], row['leader_lname'], row['leader_cell'],
@@ -78,61 +90,75 @@ def parse_row(row):
 			)
 	return row
 
-	def do_groups(group_api,group,description,parent,grandparent):
-		if not group_api.group_exists(grandparent):
-			raise Exception("Top-level group (eg 'Corporate Groups' or 'School Groups' not found.")
-		if not group_api.group_exists(parent):
-			group_api.add_group(parent,parent_name=grandparent)
-		if not group_api.group_exists(group):
-			group_api.add_group(group,parent_name=parent,description=description)			
+def do_groups(group_api,group,description,parent,grandparent):
+	if not group_api.group_exists(grandparent):
+		raise Exception("Top-level group (eg 'Corporate Groups' or 'School Groups' not found.")
+	if not group_api.group_exists(parent):
+		group_api.add_group(parent,parent_name=grandparent)
+	if not group_api.group_exists(group):
+		group_api.add_group(group,parent_name=parent,description=description)
+
+def run_job(browser, args):
+	"""
+	Adds the groups and users in CSV file args[0], using VhBrowser browser.
+	"""
+	input_filename = args[0]
+	# Check the whole file before using the browser:
+	try:
+		SCHEMA.check(input_filename, browser.vr)
+	except CsvValidationError as e:
+		print(e.report())
+		# So the daemon reports the job as failed:
+		raise
+	
+	user_api = UserApi(browser)
+	group_api = UserGroupApi(browser)
+	
+	for line_number, row in SCHEMA.rows(input_filename):
+		data = parse_row(row)
+		try:
+			do_groups(group_api, data['user_group'], data['user_group_description'],
+				data['parent_group'], data['grandparent_group'])
+		except Exception as e:
+			print(e)
+			continue
+		
+		user_data = { 'username': data['leader_username'], 'password': data['leader_password'],
+			'fname': data['leader_fname'], 'lname': data['leader_lname'],
+			'cell_phone': data['leader_cell'], 'home_phone': data['leader_home'],
+			'groups': data['leader_groups'] }
+		print(user_data)
+		try:
+			user_api.add_user(data=user_data)
+		except Exception as e:
+			# If exception is other than name already in use,
+			# re-raise it. Otherwise, igonore it.
+			if not 'already exists' in e.__str__():
+				raise(e)
 
 def main():
-	if len(sys.argv) < 4:
-		print("Usage: {} username password inputfile".format(sys.argv[0]))
+	argv = via_daemon(sys.argv)
+	if len(argv or sys.argv) < 4:
+		print("Usage: {} [--via-daemon] username password inputfile".format(sys.argv[0]))
 		print("\tAny item containing spaces must be quoted.")
 		sys.exit(1)
+	if argv is not None:
+		ok = submit_job('add_users', argv[1], argv[2], [ os.path.abspath(argv[3]) ])
+		sys.exit(0 if ok else 1)
 		
 	user = sys.argv[1]
 	password = sys.argv[2]
 	input_filename = sys.argv[3]
 	
-	
-	
-	user_api = UserApi(user,password)
-	group_api = UserGroupApi(user,password)
-	lp_api = LandingPageApi(user,password)
-	
-	with open(input_filename,'r') as infile:
-		reader = csv.DictReader(infile)
-		for row in reader:
-			try:
-				data = parse_row(row)
-			except Exception as e:
-				print(e)
-				continue
-			try:
-				do_groups(group_api, data['user_group'], data['user_group_description'],
-					data['parent_group'], data['grandparent_group'])
-			except Exception as e:
-				print(e)
-				continue
-			
-			# change groups to list...
-			s = row['leader_groups']
-			if s.strip() == '':
-				row['groups'] = [ 'Team Leaders']
-			row['groups'] = s.split(',')
-			print(row)
-			try:
-				user_api.add_user(data=row)
-			except Exception as e:
-				# If exception is other than name already in use,
-				# re-raise it. Otherwise, igonore it.
-				if not 'already in use' in e.__str__():
-					raise(e)
-				
-	
-	user_api.logout()
+	browser = VhBrowser(user,password)
+	# (The browser isn't started until it's needed, after run_job()
+	# has checked the whole file.)
+	try:
+		run_job(browser, [ input_filename ])
+	except CsvValidationError:
+		sys.exit(1)
+	finally:
+		browser.logout()
 
 if __name__ == '__main__':
 	main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+#
+# Measures the cold import cost of fsvhub, using python -X importtime.
+#
+# Each case is imported in a fresh interpreter, several times, and the
+# best (lowest) total is reported, along with whether selenium was loaded
+# and the slowest modules. Results are printed, and appended as one JSON
+# line per case to the output file (default benchmarks/import_time.jsonl),
+# so the cost can be tracked over time.
+#
+# usage: import_time.py [repeat [outputfile]]
+#
+# Run from the top-level VolunteerHubWrapper directory.
+#
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import datetime
+import json
+import os.path
+import subprocess
+import sys
+
+CASES = [
+    ('rest_only', 'import fsvhub; fsvhub.VhRest'),
+    ('browser', 'import fsvhub; fsvhub.VhBrowser; fsvhub.LandingPageApi'),
+]
+
+def run_once(code):
+    """
+    Returns a dict mapping module name -> cumulative import time in
+    microseconds, for one cold import. Names keep importtime's indentation,
+    which shows which module imported which.
+    """
+    top_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    p = subprocess.run([ sys.executable, '-X', 'importtime', '-c', code ],
+                       cwd=top_dir, stderr=subprocess.PIPE, universal_newlines=True)
+    if p.returncode != 0:
+        raise Exception("Import failed:\n{}".format(p.stderr))
+    modules = {}
+    for line in p.stderr.splitlines():
+        # Lines look like: "import time:       123 |        456 | module.name"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name[1:].rstrip()] = int(cumulative_us)
+    return modules
+
+def measure(name, code, repeat):
+    best = None
+    for i in range(repeat):
+        modules = run_once(code)
+        # Top-level modules are the ones not indented in importtime's output,
+        # so their cumulative times add up to the whole import:
+        total = sum([ us for m, us in modules.items() if not m.startswith(' ') ])
+        if best is None or total < best[0]:
+            best = (total, modules)
+    total, modules = best
+    slowest = sorted([ (us, m.strip()) for m, us in modules.items() if not m.startswith(' ') ], reverse=True)[:5]
+    return {
+        'case': name,
+        'when': datetime.datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'total_us': total,
+        'selenium_loaded': 'selenium' in [ m.strip() for m in modules ],
+        'slowest': [ { 'module': m, 'cumulative_us': us } for us, m in slowest ],
+    }
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    out_name = sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(__file__), 'import_time.jsonl')
+    with open(out_name, 'a') as outfile:
+        for name, code in CASES:
+            result = measure(name, code, repeat)
+            print("{}: {:.1f} ms (selenium loaded: {})".format(name, result['total_us'] / 1000.0,
+                                                              result['selenium_loaded']))
+            for s in result['slowest']:
+                print("\t{:>10.1f} ms  {}".format(s['cumulative_us'] / 1000.0, s['module']))
+            outfile.write(json.dumps(result) + '\n')
+
+if __name__ == '__main__':
+    main()
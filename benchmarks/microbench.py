@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+#
+# Microbenchmarks for the in-memory parts of fsvhub: loading the REST
+# collections (decoding and the add_from_json
+# handlers), the name/id lookups, Util.minify and
+# LandingPageApi.page_exists. No network or browser is used: the data
+# comes from synthetic.py, and VhRest's http_get is replaced by one
+# serving pre-encoded pages of it.
+#
+# Each benchmark is run several times and the best and median times are
+# reported. Results are printed, with the change from the previous
+# result for the same benchmark and scale in the output file, and
+# appended to it as one JSON line per benchmark (default
+# benchmarks/microbench.jsonl), so regressions are easy to spot.
+#
+# usage: microbench.py [scales [repeat [outputfile]]]
+#
+# scales is a comma-separated list (default 1000,10000; 100000 works
+# too, but needs a few GB of RAM). Run from the top-level
+# VolunteerHubWrapper directory.
+#
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import datetime
+import json
+import os.path
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fsvhub import Util, VhConfig, VhRest
+from fsvhub.caches import EventGroupCache, UserCache, UserGroupCache
+from fsvhub.jsondecode import decoder as pick_decoder, orjson
+
+import synthetic
+
+# How many lookups each lookup benchmark does:
+LOOKUPS = 10000
+# page_exists() scans the whole page list, so it gets fewer:
+PAGE_LOOKUPS = 1000
+
+
+class FakeResponse(object):
+    def __init__(self, content):
+        self.content = content
+        self.status_code = 200
+        self.headers = {}
+
+
+def rest_for(scale, data, decoder='auto'):
+    """
+    A VhRest for its own tenant, whose http_get serves data. The pages
+    are encoded up front, so only the client side is timed.
+    """
+    cfg = VhConfig('microbench-{}'.format(scale), 'x')
+    VhRest.forget(cfg)
+    vr = VhRest(cfg)
+    vr.page_sizer.adaptive = False
+    size = vr.page_sizer.base
+    pages = {}
+    for api_call in ('v2/users', 'v1/userGroups', 'v1/eventGroups'):
+        records = data[api_call]
+        pages[api_call] = [ json.dumps(records[i:i + size]).encode('utf-8')
+                            for i in range(0, len(records) + 1, size) ]
+    def http_get(api_call, params=None):
+        return FakeResponse(pages[api_call][params['page']])
+    vr.http_get = http_get
+    vr.decode = pick_decoder(decoder)
+    return vr
+
+
+def timed(func, repeat):
+    times = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def sample(rng, keys, count, misses=0.1):
+    """
+    count keys drawn from keys, about misses of them replaced by
+    keys which aren't there.
+    """
+    keys = list(keys)
+    return [ rng.choice(keys) if rng.random() >= misses else 'no such thing {}'.format(i)
+             for i in range(count) ]
+
+
+def benchmarks(scale, data):
+    """
+    Generator of (name, ops, function) for one scale.
+    """
+    rng = random.Random(scale)
+    decoders = [ 'json' ] + ([ 'orjson' ] if orjson is not None else [])
+    for decoder in decoders:
+        vr = rest_for(scale, data, decoder)
+        yield 'load_users[{}]'.format(decoder), scale, vr.get_user_list
+    vr = rest_for(scale, data)
+    yield 'load_user_groups', len(data['v1/userGroups']), vr.get_user_group_list
+    yield 'load_event_groups', len(data['v1/eventGroups']), vr.get_event_group_list
+
+    # The handlers alone, on records already decoded:
+    def parse(cache_class, records, *args):
+        def run():
+            cache = cache_class(*args)
+            for r in records:
+                cache.add_from_json(r)
+        return run
+    yield 'add_user_from_json', scale, parse(UserCache, data['v2/users'], None)
+    yield 'add_user_group_from_json', len(data['v1/userGroups']), parse(UserGroupCache, data['v1/userGroups'])
+    yield 'add_event_group_from_json', len(data['v1/eventGroups']), parse(EventGroupCache, data['v1/eventGroups'])
+
+    # Lookups, against loaded caches:
+    vr.get_user_list()
+    def lookups(func, keys):
+        def run():
+            for k in keys:
+                func(k)
+        return run
+    cases = [
+        ('user_id_from_username', vr.user_id_from_username, [ u['Username'] for u in data['v2/users'] ]),
+        ('user_name_from_id', vr.user_name_from_id, [ u['UserUid'] for u in data['v2/users'] ]),
+        ('user_group_id_from_name', vr.user_group_id_from_name, [ g['Name'] for g in data['v1/userGroups'] ]),
+        ('user_group_name_from_id', vr.user_group_name_from_id, [ g['UserGroupUid'] for g in data['v1/userGroups'] ]),
+        ('event_group_id_from_name', vr.event_group_id_from_name, [ g['Name'] for g in data['v1/eventGroups'] ]),
+        ('event_group_name_from_id', vr.event_group_name_from_id, [ g['EventGroupUid'] for g in data['v1/eventGroups'] ]),
+    ]
+    for name, func, keys in cases:
+        yield name, LOOKUPS, lookups(func, sample(rng, keys, LOOKUPS))
+    names = sample(rng, [ g['Name'] for g in data['v1/userGroups'] ], LOOKUPS, misses=0)
+    yield 'Util.minify', LOOKUPS, lookups(Util.minify, names)
+
+    try:
+        from fsvhub.webapi import LandingPageApi
+    except ImportError as e:
+        print("Skipping page_exists: {}".format(e))
+        return
+    # Not through LandingPageApi(), which wants a logged-in browser:
+    api = object.__new__(LandingPageApi)
+    api._pages = data['landing_pages']
+    api._messages = {}
+    page_names = sample(rng, [ p['name'] for p in data['landing_pages'] ], PAGE_LOOKUPS)
+    yield 'LandingPageApi.page_exists', PAGE_LOOKUPS, lookups(api.page_exists, page_names)
+
+
+def previous_results(path):
+    """
+    (bench, scale) -> the last result recorded in path.
+    """
+    last = {}
+    if os.path.exists(path):
+        with open(path) as infile:
+            for line in infile:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    continue
+                last[(r['bench'], r['scale'])] = r
+    return last
+
+
+def main():
+    scales = [ int(s) for s in sys.argv[1].split(',') ] if len(sys.argv) > 1 else [ 1000, 10000 ]
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    out_name = sys.argv[3] if len(sys.argv) > 3 else os.path.join(os.path.dirname(__file__), 'microbench.jsonl')
+    last = previous_results(out_name)
+    when = datetime.datetime.now().isoformat()
+    with open(out_name, 'a') as outfile:
+        for scale in scales:
+            print("scale {}:".format(scale))
+            data = synthetic.generate(scale)
+            for name, ops, func in benchmarks(scale, data):
+                times = timed(func, repeat)
+                result = {
+                    'bench': name,
+                    'scale': scale,
+                    'when': when,
+                    'python': sys.version.split()[0],
+                    'repeat': repeat,
+                    'ops': ops,
+                    'best_s': min(times),
+                    'median_s': statistics.median(times),
+                    'per_op_us': min(times) / ops * 1e6,
+                }
+                change = ''
+                before = last.get((name, scale))
+                if before is not None and before['best_s'] > 0:
+                    change = '  {:+.1f}%'.format((result['best_s'] / before['best_s'] - 1) * 100)
+                print("\t{:<40} {:>10.2f} ms  {:>9.3f} us/op{}".format(name, result['best_s'] * 1000,
+                                                                    result['per_op_us'], change))
+                outfile.write(json.dumps(result) + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+#
+# Measures how long VhBrowser takes to navigate to a page and find the
+# element that shows it's ready, with Firefox's default profile and with
+# the lean profile (see fsvhub/profile.py).
+#
+# Each mode gets its own browser, which visits each page in PAGES once
+# per round. The first round only warms things up (logging in, filling
+# the disk cache) and isn't counted. Results are printed, and appended
+# as one JSON line per mode to the output file (default
+# benchmarks/navigation_latency.jsonl).
+#
+# usage: navigation_latency.py username password [rounds [outputfile]]
+#
+# Needs a real Volunteer Hub account, Firefox and geckodriver. Run from
+# the top-level VolunteerHubWrapper directory.
+#
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import datetime
+import json
+import os.path
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fsvhub import VhBrowser
+
+# (config section, url key, key of the id of an element present once the page is ready)
+PAGES = [
+    ('landing_page', 'LIST_URL', 'LIST_DONE_MARKER'),
+    ('landing_page', 'EDIT_URL', 'TXT_PAGE_NAME'),
+    ('user', 'ADD_URL', 'TXT_USER_NAME'),
+    ('user', 'SEARCH_URL', 'TXT_SEARCH'),
+    ('user_group', 'EDIT_URL', 'TXT_GROUP_NAME'),
+]
+
+MODES = [ ('default', False), ('lean', True) ]
+
+def measure(user, password, mode, lean, rounds):
+    b = VhBrowser(user, password, visible=False, lean=lean)
+    # Restarts would be timed as navigations:
+    b.recycle_after = 0
+    b.recycle_rss_mb = 0
+    times = {}  # url -> [ seconds, ... ]
+    missing = 0
+    try:
+        b.ensure_logged_in()
+        for r in range(rounds + 1):
+            for section, url_key, ready_key in PAGES:
+                cfg = getattr(b.cfg, section)
+                url = cfg[url_key]
+                started = time.time()
+                b.goto(url)
+                if b.wait_for_element(cfg[ready_key]) is None:
+                    missing += 1
+                elapsed = time.time() - started
+                if r > 0:
+                    times.setdefault(url, []).append(elapsed)
+    finally:
+        b.logout()
+    every = [ t for ts in times.values() for t in ts ]
+    return {
+        'mode': mode,
+        'when': datetime.datetime.now().isoformat(),
+        'rounds': rounds,
+        'navigations': len(every),
+        'not_ready': missing,
+        'median_ms': statistics.median(every) * 1000.0,
+        'mean_ms': statistics.mean(every) * 1000.0,
+        'pages': [ { 'url': url, 'median_ms': statistics.median(ts) * 1000.0 }
+                   for url, ts in sorted(times.items()) ],
+    }
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: {} username password [rounds [outputfile]]".format(sys.argv[0]))
+        sys.exit(1)
+    user = sys.argv[1]
+    password = sys.argv[2]
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    out_name = sys.argv[4] if len(sys.argv) > 4 else os.path.join(os.path.dirname(__file__), 'navigation_latency.jsonl')
+    results = []
+    with open(out_name, 'a') as outfile:
+        for mode, lean in MODES:
+            result = measure(user, password, mode, lean, rounds)
+            results.append(result)
+            print("{}: median {:.0f} ms, mean {:.0f} ms over {} navigations ({} not ready)".format(
+                mode, result['median_ms'], result['mean_ms'], result['navigations'], result['not_ready']))
+            for p in result['pages']:
+                print("\t{:>8.0f} ms  {}".format(p['median_ms'], p['url']))
+            outfile.write(json.dumps(result) + '\n')
+    if len(results) == 2 and results[1]['median_ms'] > 0:
+        print("lean profile: {:.2f}x faster (median)".format(results[0]['median_ms'] / results[1]['median_ms']))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+#
+# Generates synthetic Volunteer Hub API data -- v2/users, v1/userGroups
+# and v1/eventGroups records shaped like the real ones -- for the
+# microbenchmarks, which need realistic volumes without a real account.
+#
+# The data depends only on the scale and the seed, so runs can be
+# compared. At scale n there are n users, n/20 user groups (at least 50)
+# and n/50 event groups (at least 20), in trees a few levels deep, and
+# each user has a dozen or so FormAnswers, like the real payload.
+#
+# usage: synthetic.py [scale [outputdir [seed]]]
+#
+# writes v2_users.json, v1_userGroups.json and v1_eventGroups.json to
+# outputdir (default benchmarks/data/<scale>).
+#
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import json
+import os
+import os.path
+import random
+import sys
+
+SCALES = (1000, 10000, 100000)
+
+FIRST_NAMES = [ 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'William',
+                'Elizabeth', 'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas' ]
+LAST_NAMES = [ 'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+               'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson' ]
+COMPANIES = [ 'Kroger', 'Acme Widgets', 'First National Bank', 'St. Mark\'s Church', 'Central High School',
+              'Riverside Rotary', 'Hilltop Credit Union', 'Metro Hospital', 'Lakeview Scouts' ]
+TEAM_KINDS = [ 'Corporate Groups', 'Family Groups', 'Faith Groups', 'School Groups', 'Civic Groups' ]
+SITES = [ 'Distribution Center', 'Mobile Pantry', 'Kids Cafe', 'Senior Boxes', 'Garden' ]
+QUESTIONS = [ 'Email', 'Phone', 'Address', 'City', 'State', 'Zip', 'Birthday', 'Shirt Size',
+              'How did you hear about us?', 'Employer', 'Emergency Contact Phone' ]
+
+
+def uid(rng):
+    return '{:08x}-{:04x}-{:04x}-{:04x}-{:012x}'.format(rng.getrandbits(32), rng.getrandbits(16),
+            rng.getrandbits(16), rng.getrandbits(16), rng.getrandbits(48))
+
+
+def tree(rng, count, top_names, leaf_name):
+    """
+    (id, parent id, name) for count groups: one root, top_names under
+    it, then the rest spread over the top-level groups and their
+    children, so the trees are a few levels deep.
+    """
+    root = uid(rng)
+    groups = [ (root, None, 'All') ]
+    tops = []
+    for name in top_names:
+        gid = uid(rng)
+        groups.append((gid, root, name))
+        tops.append(gid)
+    middles = []
+    n = 0
+    while len(groups) < count:
+        n += 1
+        if middles and rng.random() < 0.7:
+            parent = rng.choice(middles)
+        else:
+            parent = rng.choice(tops)
+        gid = uid(rng)
+        groups.append((gid, parent, '{} {}'.format(leaf_name(rng), n)))
+        if parent in tops:
+            middles.append(gid)
+    return groups
+
+
+def user_groups(rng, count):
+    return [ { 'UserGroupUid': gid, 'ParentUserGroupUid': parent, 'Name': name,
+               'Description': 'Synthetic group {}'.format(name), 'Joinability': 'AdminsOnly',
+               'ImportKey': None }
+             for gid, parent, name in tree(rng, count, TEAM_KINDS,
+                                           lambda r: '{} - {}'.format(r.choice(COMPANIES), r.choice(LAST_NAMES))) ]
+
+
+def event_groups(rng, count):
+    return [ { 'EventGroupUid': gid, 'ParentEventGroupId': parent, 'Name': name,
+               'Description': '', 'IsActive': True }
+             for gid, parent, name in tree(rng, count, SITES,
+                                           lambda r: '{} Shift'.format(r.choice(SITES))) ]
+
+
+def users(rng, count, group_ids):
+    out = []
+    for i in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        answers = []
+        for q in QUESTIONS:
+            answers.append({ 'FormAnswerUid': uid(rng), 'FormQuestionUid': uid(rng), 'Name': q,
+                             'Value': '{} answer for {} {}'.format(q, first, last),
+                             'Type': 'Text' })
+        # The name answer, somewhere among the others, with its extra fields:
+        answers.insert(rng.randrange(len(answers)), { 'FormAnswerUid': uid(rng), 'FormQuestionUid': uid(rng),
+                       'Name': 'Name', 'Type': 'Name', 'FirstName': first, 'LastName': last,
+                       'MiddleName': '', 'Prefix': '', 'Suffix': '' })
+        out.append({ 'UserUid': uid(rng), 'Username': '{} {} {}'.format(first, last, i),
+                     'UserGroupMemberships': rng.sample(group_ids, rng.randint(1, 4)),
+                     'FormAnswers': answers, 'LastUpdate': '2018-0{}-1{}T12:00:00'.format(rng.randint(1, 9), rng.randint(0, 9)),
+                     'IsDisabled': False })
+    return out
+
+
+def landing_pages(rng, count):
+    """
+    The dicts LandingPageApi keeps in its pages list.
+    """
+    return [ { 'id': str(1000 + i), 'name': 'X - {} {}'.format(rng.choice(COMPANIES), i),
+               'url0': 'http://example.org/lp/{}'.format(i) } for i in range(count) ]
+
+
+def generate(scale, seed=0):
+    """
+    dict of api call -> list of records, plus 'landing_pages'.
+    """
+    rng = random.Random('{}-{}'.format(scale, seed))
+    ug = user_groups(rng, max(50, scale // 20))
+    return {
+        'v2/users': users(rng, scale, [ g['UserGroupUid'] for g in ug ]),
+        'v1/userGroups': ug,
+        'v1/eventGroups': event_groups(rng, max(20, scale // 50)),
+        'landing_pages': landing_pages(rng, max(20, scale // 10)),
+    }
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else SCALES[0]
+    out_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(__file__), 'data', str(scale))
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+    for api_call, records in generate(scale, seed).items():
+        path = os.path.join(out_dir, api_call.replace('/', '_') + '.json')
+        with open(path, 'w') as outfile:
+            json.dump(records, outfile)
+        print("{}: {} records".format(path, len(records)))
+
+if __name__ == '__main__':
+    main()
@@ -33,6 +33,23 @@
 #   * lp_name. Name of landing page to create. If this is blank, the name will
 #   be generated by concatenating 'X - ' and the org_name, for example 'X -
 #   Kroger.'
+#   * leader_skip. If true ('1', 'Y', 'y', 'yes', 'T', 'true', etc.), don't add the leader.
+#   * complete. If true, skip this row entirely.
+#
+# The whole file is checked before the browser is started. If any rows
+# are bad (missing required fields, phone numbers without ten digits,
+# unknown groups), all of them are listed and nothing is done.
+#
+# Rows are worked on in two stages, one thread each: a lookahead stage
+# parses the rows and finds out, from the REST caches, which groups,
+# landing pages and leaders already exist, and the browser stage adds
+# whatever is missing, checking again first, so what an earlier row
+# failed to add is still added. Rows needing nothing added never reach
+# the browser. Up to [TRANSACTIONS] LOOKAHEAD rows wait between the stages
+# (0 does everything in one thread, a row at a time); how busy each
+# stage was is printed at the end.
+#
+# With --via-daemon, the job is run by vhdaemon.py instead.
 #
 # The easiest way to construct a suitable CSV file is to add the data to
 # a spreadsheet and then save the spreadsheet as a CSV file.
@@ -51,77 +68,183 @@
 #
 # This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
 
-import csv
-#import os.path
-#import re
+import os.path
+import queue
 import sys
+import threading
+import time
 
 #from selenium.webdriver.support.ui import Select
-from fsvhub import UserApi, UserGroupApi, LandingPageApi, VhBrowser
+from fsvhub import (UserApi, UserGroupApi, LandingPageApi, VhBrowser,
+        CsvField, CsvSchema, CsvValidationError)
+from fsvhub.daemon import submit_job, via_daemon
+
+SCHEMA = CsvSchema([
+    CsvField('team_name', required=True, creates='user_group'),
+    CsvField('org_name', required=True, creates='user_group'),
+    CsvField('org_category', required=True, references='user_group'),
+    CsvField('event_group', required=True, references='event_group', also_allow=('All Events',)),
+    CsvField('leader_fname', required=True),
+    CsvField('leader_lname', required=True),
+    CsvField('leader_username'),
+    CsvField('leader_password'),
+    CsvField('leader_work_phone', kind='phone'),
+    CsvField('leader_work_ext'),
+    CsvField('leader_cell_phone', kind='phone'),
+    CsvField('leader_home_phone', kind='phone'),
+    CsvField('leader_unk_phone', kind='phone'),
+    CsvField('leader_email'),
+    CsvField('leader_groups', kind='list', references='user_group'),
+    CsvField('leader_skip', kind='flag'),
+    CsvField('lp_name'),
+    CsvField('complete', kind='flag'),
+    ])
+
+class StageTimes(object):
+    """
+    How many rows a pipeline stage handled, and how long it spent
+    working on them and waiting for the other stage.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+
+    def report(self, elapsed):
+        return "{}: {} rows, busy {:.1f}s of {:.1f}s ({:.0%}), waited {:.1f}s".format(
+                self.name, self.rows, self.busy, elapsed, self.busy / elapsed if elapsed else 0, self.waiting)
+
 
 class TransactionProcessor(object):
-    def __init__(self,username,password,input_filename):
+    def __init__(self,browser,input_filename,leaders):
+        # input_filename has already been checked, and the leaders to
+        # add counted, by run_job().
         self.input_filename = input_filename
-        self.browser = VhBrowser(username,password)
+        self.browser = browser
         self.user_api = UserApi(self.browser)
+        # Download all users only if there are enough to check to make
+        # it worthwhile; otherwise each one is looked up on its own.
+        # Either way, start the browser in the background meanwhile
+        # (the groups were loaded by the check in run_job()).
+        if self.user_api.plan_lookups(leaders):
+            self.browser.start_warm_up(('users',))
+        else:
+            self.browser.start_warm_up(())
         self.lp_api = LandingPageApi(self.browser)
         self.group_api = UserGroupApi(self.browser)
-        self.req_fields = [
-                    'team_name', 'org_name', 'org_category', 'event_group',
-                        'leader_fname','leader_lname'
-                    ]
-        self.truth_markers = '1yYtT'
+        cfg = self.browser.cfg.cfg
+        self.lookahead = cfg.getint('TRANSACTIONS', 'LOOKAHEAD', fallback=4) if cfg.has_section('TRANSACTIONS') else 4
 
     def run(self):
-        with open(self.input_filename,'r') as infile:
-            reader = csv.DictReader(infile)
-            for row in reader:
-                if self.is_done(row):
-                    print("Skipping this row")
-                    print(row)
-                else:
-                    try:
-                        self.process_row(row)
-                    except Exception as e:
-                        if "Required field" in e.__str__():
-                            print(e) # alert user but don't abort loop
-                            continue
-                        else:
-                            raise(e)
-                #input('Press ENTER to continue...')
+        if self.lookahead < 1:
+            for line_number, row in SCHEMA.rows(self.input_filename):
+                self.process_row(row, line_number)
+            return
+        # The landing page list is read with the browser, so read it
+        # before the lookahead stage needs it:
+        self.lp_api.pages
+        work = queue.Queue(maxsize=self.lookahead)
+        stop = threading.Event()
+        ahead = StageTimes('Lookahead stage')
+        behind = StageTimes('Browser stage')
+        started = time.time()
+        thread = threading.Thread(target=self.look_ahead, args=(work, stop, ahead), daemon=True)
+        thread.start()
+        try:
+            while True:
+                waited_from = time.time()
+                plan = work.get()
+                busy_from = time.time()
+                behind.waiting += busy_from - waited_from
+                if plan is None:
+                    break
+                if isinstance(plan, Exception):
+                    raise plan
+                if not self.needs_browser(plan):
+                    print('\n'.join(plan['notes']))
+                    continue
+                self.apply_plan(plan)
+                behind.rows += 1
+                behind.busy += time.time() - busy_from
+        finally:
+            # Lets the lookahead stage give up, if this one failed:
+            stop.set()
+            elapsed = time.time() - started
+            print(ahead.report(elapsed))
+            print(behind.report(elapsed))
+
+    def look_ahead(self, work, stop, times):
+        """
+        The lookahead stage: plans each row, and queues the plans of
+        rows with something to add for the browser stage. It prints
+        nothing itself -- under vhdaemon.py, only the job's own thread
+        prints to the client -- so what was found for rows with nothing
+        to add is passed along in the notes of the next plan queued, or
+        in a plan with nothing to add if the browser stage is idle. Ends
+        by queueing None, after any exception.
+        """
+        notes = []
+        try:
+            for line_number, row in SCHEMA.rows(self.input_filename):
+                busy_from = time.time()
+                plan = self.plan_row(row, line_number)
+                times.rows += 1
+                times.busy += time.time() - busy_from
+                notes += plan['notes']
+                if not self.needs_browser(plan) and not work.empty():
+                    continue
+                plan['notes'] = notes
+                notes = []
+                waited_from = time.time()
+                ok = self.put(work, plan, stop)
+                times.waiting += time.time() - waited_from
+                if not ok:
+                    return
+        except Exception as e:
+            if notes:
+                self.put(work, self.notes_only(notes), stop)
+                notes = []
+            self.put(work, e, stop)
+        if notes:
+            self.put(work, self.notes_only(notes), stop)
+        self.put(work, None, stop)
+
+    def notes_only(self, notes):
+        return { 'data': None, 'notes': notes, 'groups': False, 'page': False, 'user': 'skip' }
+
+    def put(self, work, item, stop):
+        # Waits for room in the queue, unless the browser stage stops.
+        while not stop.is_set():
+            try:
+                work.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
 
     def parse_row(self,row):
-        # verify required fields present. While we're at it,
-        # strip leading/trailing whitespace.
-        for f in self.req_fields:
-            s = row.get(f,'').strip()
-            if s == '':
-                raise Exception("Required field {} not present".format(f))
-            else:
-                row[f] = s # Substitute stripped value for original
+        # row has already been validated and normalized by SCHEMA.
         ret_data = { }
         ret_data['user_groups'] = { 'self': row['team_name'], 'parent':
                              row['org_name'],'grandparent': row['org_category'] }
         ret_data['event_group'] = row['event_group']
         # generate group list, if not explicitly given:
-        s = row.get('leader_groups','').strip()
-        if s == '':
+        if not row['leader_groups']:
             ret_data['leader'] = { 'groups': [ 'Team Leaders', row['team_name'] ] }
         else:
-            ret_data['leader'] = { 'groups': s.split(',') }
+            ret_data['leader'] = { 'groups': row['leader_groups'] }
         ret_data['leader']['fname'] = row['leader_fname']
         ret_data['leader']['lname'] = row['leader_lname']
-        # Next set of fields can be blank or omitted, so use .get(field,'')
-        # so there won't be an exception if the field isn't there.
         for f in [
         'username','password','work_phone','work_ext','home_phone',
             'cell_phone', 'unk_phone', 'email','skip']:
-            ret_data['leader'][f] = row.get('leader_' + f,'').strip()
+            ret_data['leader'][f] = row['leader_' + f]
         if ret_data['leader']['username'] == '':
             # Generate leader's user_name, if not given in data file.
             ret_data['leader']['username'] = ret_data['leader']['fname'] + ' ' + ret_data['leader']['lname']
         # See if we have a landing page name...
-        pname = row.get('lp_name','').strip()
+        pname = row['lp_name']
         # If not, generate it from parent group's name...
         if pname == '':
             pname = 'X - {}'.format(ret_data['user_groups']['parent'])
@@ -152,6 +275,90 @@ class TransactionProcessor(object):
             s += ' Email: ' + data['leader']['email']
         return s
 
+    def plan_row(self, row, line_number=None):
+        """
+        Works out what row needs added, without using the browser, so
+        that it can run ahead of it. Something an earlier row is still
+        to add counts as missing: the browser stage checks again before
+        adding anything (see apply_plan()), so it's added once, and is
+        still added if the earlier row failed to add it. Returns a dict of:
+            'data' -- from parse_row()
+            'notes' -- lines to print about the row
+            'groups', 'page' -- True if anything must be added
+            'user' -- 'skip', 'exists', 'add', or 'check' if finding
+                out whether the leader exists needs the browser
+        """
+        notes = [ "Row {}:".format(line_number) ]
+        plan = { 'data': None, 'notes': notes, 'groups': False, 'page': False, 'user': 'skip' }
+        if self.is_done(row):
+            notes += [ "Skipping this row", str(row) ]
+            return plan
+        data = plan['data'] = self.parse_row(row)
+        notes.append(str(data))
+
+        groups = data['user_groups']
+        if not self.group_api.group_exists(groups['grandparent']):
+            raise Exception("Top-level group (eg 'Corporate Groups' or 'School Groups') not found.")
+        for name in (groups['parent'], groups['self']):
+            if not self.group_api.group_exists(name):
+                plan['groups'] = True
+        if not plan['groups']:
+            notes.append("Groups {} / {} / {} exist.".format(groups['grandparent'], groups['parent'], groups['self']))
+            warning = self.group_path_warning(groups)
+            if warning:
+                notes.append(warning)
+
+        pname = data['landing_page']['name']
+        if self.lp_api.page_exists(pname):
+            notes.append("Skipping landing page {} for group {} - it already exists".format(pname, groups['parent']))
+        else:
+            plan['page'] = True
+
+        leader = data['leader']
+        username = leader['username']
+        if self.skip_user(leader):
+            notes.append(str({ 'result': 'Data input requires skipping user {}'.format(username) }))
+        else:
+            # Point lookups go through the Users page, so leave them to
+            # the browser stage:
+            if self.browser.vr.users_loaded() or self.user_api.bulk_lookups:
+                plan['user'] = 'exists' if self.user_api.user_exists(username) else 'add'
+            else:
+                plan['user'] = 'check'
+            if plan['user'] == 'exists':
+                notes.append(str({ 'result': 'User {} already exists -- not adding'.format(username) }))
+        return plan
+
+    def needs_browser(self, plan):
+        return plan['groups'] or plan['page'] or plan['user'] in ('add', 'check')
+
+    def apply_plan(self, plan):
+        """
+        Adds what plan_row() found missing. The do_ methods check again
+        that each thing is missing, which costs only a cache lookup, and
+        sees what earlier rows have added (or failed to add) since the
+        plan was made.
+        """
+        print('\n'.join(plan['notes']))
+        data = plan['data']
+        if plan['groups']:
+            self.do_groups(data['user_groups'])
+        if plan['page']:
+            self.do_landing_page(data)
+        if plan['user'] in ('add', 'check'):
+            print(self.do_user(data['leader']))
+
+    def group_path_warning(self, groupdata):
+        # Existing groups might be filed somewhere else:
+        grandparent = groupdata['grandparent']
+        parent = groupdata['parent']
+        user_group = groupdata['self']
+        vr = self.browser.vr
+        if not vr.user_group_is_under(user_group, parent) or not vr.user_group_is_under(parent, grandparent):
+            return "Warning: group {} is not under {} / {}. Its path is: {}".format(
+                    user_group, grandparent, parent, ' / '.join(vr.user_group_path(user_group)))
+        return None
+
     def do_groups(self,groupdata):
         grandparent = groupdata['grandparent']
         parent = groupdata['parent']
@@ -168,6 +375,9 @@ class TransactionProcessor(object):
         if not self.group_api.group_exists(user_group):
             print("Calling 'group_api.add_group({},parent_name={},description={})'".format(user_group,parent,description) )
             self.group_api.add_group(user_group,parent_name=parent,description=description)
+        warning = self.group_path_warning(groupdata)
+        if warning:
+            print(warning)
 
     def do_landing_page(self,data):
         gname = data['user_groups']['parent']
@@ -196,41 +406,60 @@ class TransactionProcessor(object):
                 else:
                     raise(e)
 
-    def process_row(self,row):
-        data = self.parse_row(row)
-        team_name = data['user_groups']['self']
-        print("Processing group {}".format(team_name))
-        print(data)
-        self.do_groups(data['user_groups'])
-        self.do_landing_page(data)
-        print(self.do_user(data['leader']))
+    def process_row(self, row, line_number=None):
+        # Both stages at once, without the pipeline:
+        plan = self.plan_row(row, line_number)
+        if self.needs_browser(plan):
+            self.apply_plan(plan)
+        else:
+            print('\n'.join(plan['notes']))
 
     def logout(self):
         self.browser.logout()
 
     def is_done(self,data):
-        return self.field_is_true(data, 'complete')
+        return data['complete']
 
     def skip_user(self,userdata):
-        return self.field_is_true(userdata,'skip')
+        return userdata['skip']
 
-    def field_is_true(self,data,fieldname):
-        s = data.get(fieldname,'').lstrip()
-        if s == '':
-            return False
-        else:
-            return s[0] in self.truth_markers
+def run_job(browser, args):
+    """
+    Processes CSV file args[0] using VhBrowser browser.
+    """
+    input_filename = args[0]
+    # Check the whole file before using the browser, counting the
+    # leaders to look up as it goes:
+    leaders = [ 0 ]
+    def count_leaders(line_number, row):
+        if not row['complete'] and not row['leader_skip']:
+            leaders[0] += 1
+    try:
+        SCHEMA.check(input_filename, browser.vr, each_row=count_leaders)
+    except CsvValidationError as e:
+        print(e.report())
+        # So the daemon reports the job as failed:
+        raise
+    TransactionProcessor(browser, input_filename, leaders[0]).run()
 
 def main():
-    if len(sys.argv) < 4:
-        print("Usage: {} username password inputfile".format(sys.argv[0]))
+    argv = via_daemon(sys.argv)
+    if len(argv or sys.argv) < 4:
+        print("Usage: {} [--via-daemon] username password inputfile".format(sys.argv[0]))
         print("\tAny item containing spaces must be quoted.")
         sys.exit(1)
-    tp = TransactionProcessor(sys.argv[1], sys.argv[2],sys.argv[3])
+    if argv is not None:
+        ok = submit_job('transactions', argv[1], argv[2], [ os.path.abspath(argv[3]) ])
+        sys.exit(0 if ok else 1)
+    browser = VhBrowser(sys.argv[1], sys.argv[2])
+    # (The browser isn't started until it's needed, after run_job()
+    # has checked the whole file.)
     try:
-        tp.run()
+        run_job(browser, [ sys.argv[3] ])
+    except CsvValidationError:
+        sys.exit(1)
     finally:
-        tp.logout()
+        browser.logout()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+# Exports VolunteerHub data to files, for analytics.
+#
+# usage: export_data.py [--via-daemon] username password collections [outdir [format [startdate [enddate]]]]
+# example: export_data.py "joe smith" secret users,events dumps csv.gz 2016-01-01T00:00
+#
+# collections is a comma-separated list of users, user_groups,
+# event_groups, events and landing_pages, or "all". Each goes to its
+# own file in outdir (default: the current directory), for example
+# dumps/users.csv.gz. format is jsonl (one JSON record per line, the
+# default) or csv, either optionally followed by .gz for gzip.
+# startdate and enddate limit the events exported (default: all).
+#
+# Everything but the landing pages comes from the REST API, a page at a
+# time, and is written as it arrives. If an export is interrupted,
+# running the same command again carries on from the last page written
+# (see fsvhub/export.py). The landing pages are read in the browser,
+# which is only started if they are asked for.
+#
+# With --via-daemon, the export is run by vhdaemon.py instead.
+#
+# Uses built-in datetime, os.path and sys modules.
+#
+# Uses selenium (third party, available via PyPi), only for landing_pages.
+#
+# Uses fsvhub and config file vhconfig.cfg
+#
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import datetime
+import os.path
+import sys
+
+from fsvhub import VhConfig, VhRest
+from fsvhub.daemon import submit_job, via_daemon
+from fsvhub.export import COLLECTIONS, Exporter
+
+DATE_PATTERN = '%Y-%m-%dT%H:%M'
+ALL = [ 'users', 'user_groups', 'event_groups', 'events', 'landing_pages' ]
+
+def export(c, vr, args, b=None):
+	names = ALL if args[0] == 'all' else [ n.strip() for n in args[0].split(',') ]
+	for name in names:
+		if name not in COLLECTIONS and name != 'landing_pages':
+			raise Exception("Unknown collection {}".format(name))
+	out_dir = args[1] if len(args) > 1 else '.'
+	fmt = args[2] if len(args) > 2 else 'jsonl'
+	params = {}
+	if len(args) > 3:
+		params['earliestTime'] = datetime.datetime.strptime(args[3], DATE_PATTERN).isoformat(timespec='seconds')
+	if len(args) > 4:
+		params['latestTime'] = datetime.datetime.strptime(args[4], DATE_PATTERN).isoformat(timespec='seconds')
+	ex = Exporter(vr)
+	for name in names:
+		path = os.path.join(out_dir, '{}.{}'.format(name, fmt))
+		if name == 'landing_pages':
+			count = ex.export_records(landing_pages(c, b), path)
+		else:
+			count = ex.export(name, path, params if name == 'events' else None)
+		print("{}: {} records".format(path, count))
+
+def landing_pages(c, b=None):
+	# Imported here, so REST-only exports don't load selenium:
+	from fsvhub import VhBrowser, LandingPageApi
+	# A browser passed in (by the daemon) is left logged in.
+	own_browser = b is None
+	if own_browser:
+		b = VhBrowser(c.username, c.password)
+	try:
+		return list(LandingPageApi(b).pages)
+	finally:
+		if own_browser:
+			b.logout()
+
+def run_job(b, args):
+	"""
+	Exports collections args[0], with optional output directory, format
+	and event dates args[1:], using VhBrowser b, for vhdaemon.py.
+	"""
+	export(b.cfg, b.vr, args, b)
+
+def main():
+	argv = via_daemon(sys.argv)
+	if len(argv or sys.argv) < 4 or len(argv or sys.argv) > 8:
+		print("Usage: {} [--via-daemon] username password collections [outdir [format [startdate [enddate]]]]".format(sys.argv[0]))
+		print("\tAny item containing spaces must be quoted.")
+		sys.exit(1)
+	if argv is not None:
+		args = argv[3:]
+		if len(args) > 1:
+			args[1] = os.path.abspath(args[1])
+		else:
+			args.append(os.path.abspath('.'))
+		ok = submit_job('export', argv[1], argv[2], args)
+		sys.exit(0 if ok else 1)
+	c = VhConfig(sys.argv[1], sys.argv[2])
+	export(c, VhRest(c), sys.argv[3:])
+
+if __name__ == '__main__':
+	main()
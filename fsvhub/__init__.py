@@ -0,0 +1,40 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+#
+# fsvhub is the library behind the VolunteerHubWrapper command-line scripts.
+#
+# The REST client, the config and the CSV ingestion code don't need a
+# browser, so importing fsvhub only loads those. The Selenium-based
+# classes (VhBrowser, UserApi, UserGroupApi, LandingPageApi, TabPool,
+# EventSweep) are imported the first time one of them is used, so
+# REST-only jobs don't pay for loading selenium and pyvirtualdisplay.
+
+import importlib
+
+from .config import VhConfig
+from .ingest import CsvField, CsvRowError, CsvSchema, CsvValidationError
+from .rest import VhRest
+from .state import LocalState
+from .util import Util
+from .waits import ElementsMissing, LoadTimes
+
+# name -> submodule, for classes which are only imported when first used:
+_lazy = {
+    'VhBrowser': 'browser',
+    'UserApi': 'webapi',
+    'UserGroupApi': 'webapi',
+    'LandingPageApi': 'webapi',
+    'TabPool': 'tabs',
+    'EventSweep': 'sweep',
+}
+
+def __getattr__(name):
+    if name in _lazy:
+        module = importlib.import_module('.' + _lazy[name], __name__)
+        value = getattr(module, name)
+        # Cache it, so __getattr__ isn't called again for this name:
+        globals()[name] = value
+        return value
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_lazy.keys()))
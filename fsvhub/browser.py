@@ -0,0 +1,562 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from pyvirtualdisplay import Display
+from selenium import webdriver
+from selenium.common.exceptions import InvalidSessionIdException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.firefox.firefox_binary import FirefoxBinary
+from urllib3.exceptions import HTTPError as Urllib3Error
+
+from .config import VhConfig
+from .profile import BrowserProfile
+from .rest import VhRest
+from .waits import ElementsMissing, LoadTimes
+
+# What a crashed or hung browser (or geckodriver) raises:
+BROWSER_ERRORS = (WebDriverException, Urllib3Error, OSError)
+# Of those, the ones which always mean the browser is gone, rather than
+# something wrong with the page (a missing element, a timeout):
+BROWSER_GONE = (InvalidSessionIdException, Urllib3Error, OSError)
+
+
+class VhBrowser(object):
+    """
+    Handles actual web interactions with VH site, especially
+    opening URLs.
+    Clients can use this to get page elements if needed,
+    but whenever possible interactions with web pages
+    should be handled internally in this class.
+
+    Normally the browser is started and logged in by the first goto(),
+    and each REST collection is loaded the first time it's used. If
+    warm_up is given, both start right away in the background instead:
+    the browser launch and login on one thread, while the REST collections
+    load on others. The first goto() then waits only for the login, if
+    it's still running; code using a collection which is still loading
+    waits for that load (see VhRest), and wait_for_rest() waits for all
+    of them. warm_up may be True (load every collection in
+    VhRest.collection_names) or a sequence of collection names, for example
+    ('users',).
+
+    Waits (wait_for_elements() and the wait_for_element* helpers built on
+    it) poll for all of their elements at once, give up as soon as the
+    page has finished loading without them, and otherwise time out after
+    a period based on how long the page usually takes (see LoadTimes).
+
+    For long runs, goto() restarts Firefox every RECYCLE_AFTER
+    navigations, when it's using more than RECYCLE_RSS_MB of memory
+    (checked every RSS_CHECK_EVERY navigations), and when the browser
+    fails while loading a page; the settings are in the [BROWSER] section
+    of the config (0 turns a limit off). The new browser gets the old
+    one's session cookies, so it doesn't have to log in again.
+
+    Firefox is started with the lean profile (no images, web fonts or
+    tracking scripts, 'eager' page loads, a disk cache kept between runs)
+    if LEAN_PROFILE is set in [BROWSER] or lean is True; see BrowserProfile.
+    """
+    def __init__(self,username,password,visible=True,warm_up=False,lean=None):
+        self.cfg = VhConfig(username,password)
+        self.visible = visible
+        # lean (default: LEAN_PROFILE in the config) picks the lean Firefox profile:
+        self.profile = BrowserProfile.from_config(self.cfg, lean)
+        self.browser = None
+        self.display = None
+        self.old_window_handle = None
+        # Leased until logout(), so other tenants can't crowd it out:
+        self.vr = VhRest.acquire(self.cfg)
+        self._vr_leased = True
+        self.load_times = LoadTimes.from_config(self.cfg)
+        wait_cfg = self.cfg.cfg['WAIT'] if self.cfg.cfg.has_section('WAIT') else {}
+        # How long missing elements may take to show up after the page has
+        # finished loading (scripts may still be adding them):
+        self.ready_grace = float(wait_cfg.get('READY_GRACE', 1))
+        self.poll_interval = float(wait_cfg.get('POLL_INTERVAL', 0.1))
+        # The page goto() went to last, when, and whether it's been timed yet:
+        self._page_url = None
+        self._page_started = None
+        self._page_timed = True
+        browser_cfg = self.cfg.cfg['BROWSER'] if self.cfg.cfg.has_section('BROWSER') else {}
+        self.recycle_after = int(browser_cfg.get('RECYCLE_AFTER', 500))
+        self.recycle_rss_mb = float(browser_cfg.get('RECYCLE_RSS_MB', 1500))
+        self.rss_check_every = max(1, int(browser_cfg.get('RSS_CHECK_EVERY', 10)))
+        self.navigations = 0
+        self.restarts = 0
+        # Set by restart(), to check on the next goto() that the session
+        # cookies it carried over still work:
+        self._check_session = False
+        self._login_future = None
+        self._rest_future = None
+        # REST collections loaded (or being loaded) by the warm-up:
+        self.warm_up_collections = ()
+        if warm_up:
+            collections = VhRest.collection_names if warm_up is True else tuple(warm_up)
+            self.start_warm_up(collections)
+
+    def start_warm_up(self, collections=None):
+        """
+        Starts logging in, and loading the given REST collections,
+        in the background. See the class docstring.
+        """
+        executor = ThreadPoolExecutor(max_workers=2)
+        if self.browser is None and self._login_future is None:
+            self._login_future = executor.submit(self.login_to_vh)
+        if collections and self._rest_future is None:
+            self.warm_up_collections = tuple(collections)
+            self._rest_future = executor.submit(self.vr.preload, collections)
+        # Don't block here; the threads finish on their own:
+        executor.shutdown(wait=False)
+
+    def wait_for_login(self):
+        """
+        Waits for a background login, if one was started, and
+        re-raises any exception it raised.
+        """
+        if self._login_future is not None:
+            future, self._login_future = self._login_future, None
+            future.result()
+
+    def wait_for_rest(self):
+        """
+        Waits for background REST loading, if it was started, and
+        re-raises any exception it raised.
+        """
+        if self._rest_future is not None:
+            future, self._rest_future = self._rest_future, None
+            future.result()
+
+    def wait_for_warm_up(self):
+        """
+        Waits for both parts of the warm-up.
+        """
+        try:
+            self.wait_for_login()
+        finally:
+            self.wait_for_rest()
+
+    def switch_to_newest_window(self):
+        self.browser.switch_to_window(self.browser.window_handles[-1])
+
+    def save_window_handle(self):
+        self.old_window_handle = self.browser.current_window_handle
+
+    def return_to_previous_window(self):
+        if self.old_window_handle is not None:
+            self.browser.switch_to_window(self.old_window_handle)
+            self.old_window_handle = None
+
+    def _page_loading(self, url):
+        self._page_url = url
+        self._page_started = time.time()
+        self._page_timed = False
+
+    def wait_for_elements(self, locators, timeout=None, required=True):
+        """
+        Waits until every one of locators is on the page, and returns the
+        elements, in the same order. A locator is an element id, or a
+        (By.<something>, value) pair; By.ID, By.CSS_SELECTOR, By.XPATH and
+        By.NAME are understood. The whole set is looked for in one call
+        to the browser per poll.
+
+        If some are still missing ready_grace seconds after the page has
+        finished loading, or after timeout seconds (by default, what
+        self.load_times allows for the page goto() last went to), raises
+        ElementsMissing listing them -- or, if required is False, returns
+        None in their places.
+        """
+        specs = [ (By.ID, l) if isinstance(l, str) else tuple(l) for l in locators ]
+        url = self._page_url
+        if timeout is None:
+            timeout = self.load_times.timeout(url)
+        started = time.time()
+        complete_since = None
+        while True:
+            try:
+                found, ready_state = self.browser.execute_script("""
+                    var specs = arguments[0];
+                    var found = [];
+                    for (var i = 0; i < specs.length; i++) {
+                        var how = specs[i][0], what = specs[i][1], el = null;
+                        if (how == 'id') {
+                            el = document.getElementById(what);
+                        } else if (how == 'css selector') {
+                            el = document.querySelector(what);
+                        } else if (how == 'xpath') {
+                            el = document.evaluate(what, document, null,
+                                XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+                        } else if (how == 'name') {
+                            el = document.getElementsByName(what)[0] || null;
+                        }
+                        found.push(el);
+                    }
+                    return [found, document.readyState];
+                    """, specs)
+                error = None
+            except WebDriverException as e:
+                # Most likely the page is being replaced; try again.
+                found, ready_state = [ None ] * len(specs), 'loading'
+                error = e
+            now = time.time()
+            missing = [ l for l, el in zip(locators, found) if el is None ]
+            if not missing:
+                if not self._page_timed:
+                    self.load_times.record(url, now - self._page_started)
+                    self._page_timed = True
+                return found
+            reason = None
+            if ready_state == 'complete':
+                if complete_since is None:
+                    complete_since = now
+                if now - complete_since >= self.ready_grace:
+                    reason = 'Page finished loading'
+            else:
+                complete_since = None
+            if reason is None and now - started >= timeout:
+                reason = 'Timed out after {:.1f}s'.format(timeout)
+            if reason is not None:
+                if error is not None:
+                    # Still failing when we give up: the trouble is
+                    # with the browser, not a missing element.
+                    raise error
+                if required:
+                    raise ElementsMissing(url, missing, reason)
+                return found
+            time.sleep(self.poll_interval)
+
+    def wait_for_element(self, el_id, timeout=None):
+        """
+        Returns the element with id el_id, or None if it doesn't turn up
+        (see wait_for_elements()).
+        """
+        return self.wait_for_elements([ el_id ], timeout, required=False)[0]
+
+    def wait_for_element_by_css(self, css_spec, timeout=None):
+        return self.wait_for_elements([ (By.CSS_SELECTOR, css_spec) ], timeout, required=False)[0]
+
+    def wait_for_element_to_disappear(self, el_id, timeout=10):
+            WebDriverWait(self.browser, timeout).until(
+                EC.staleness_of(el_id)
+                );
+
+    def checkbox_states(self, id_regex):
+        """
+        Returns a dict mapping id -> checked (True/False) for every
+        checkbox on the current page whose id matches id_regex (a
+        regular expression string, searched for anywhere in the id).
+        All of them are read in one call to the browser, rather than
+        one round trip per checkbox.
+        """
+        return self.browser.execute_script("""
+            var patt = new RegExp(arguments[0]);
+            var states = {};
+            var inputs = document.querySelectorAll('input[type="checkbox"]');
+            for (var i = 0; i < inputs.length; i++) {
+                if (inputs[i].id && patt.test(inputs[i].id)) {
+                    states[inputs[i].id] = inputs[i].checked;
+                }
+            }
+            return states;
+            """, id_regex)
+
+    def selected_options(self, id_regex):
+        """
+        Returns a dict mapping id -> text of the selected option for
+        every select on the current page whose id matches id_regex.
+        Like checkbox_states(), this is one call to the browser.
+        """
+        return self.browser.execute_script("""
+            var patt = new RegExp(arguments[0]);
+            var texts = {};
+            var selects = document.querySelectorAll('select');
+            for (var i = 0; i < selects.length; i++) {
+                var s = selects[i];
+                if (s.id && patt.test(s.id) && s.selectedIndex >= 0) {
+                    texts[s.id] = s.options[s.selectedIndex].text;
+                }
+            }
+            return texts;
+            """, id_regex)
+
+    def find_list_by_css(self,css_spec):
+        return self.browser.find_elements_by_css_selector(css_spec)
+
+    def find_element_by_css(self,css_spec):
+        return self.browser.find_element_by_css_selector(css_spec)
+
+    def find_list_by_xpath(self, xpath_spec):
+        return self.browser.find_elements_by_xpath(xpath_spec)
+
+    def find_element_by_xpath(self,xpath_spec):
+        return self.browser.find_element_by_xpath(xpath_spec)
+
+    def ensure_logged_in(self):
+        """
+        Starts the browser and logs in, unless that's already been done
+        (or is being done by the warm-up, in which case, waits for it --
+        but not for the warm-up's REST loading, which the browser doesn't
+        need).
+        """
+        self.wait_for_login()
+        if self.browser is None:
+            self.login_to_vh()
+
+    def goto(self,url):
+        self.ensure_logged_in()
+        reason = self.recycle_reason()
+        if reason is not None:
+            self.restart(reason)
+        try:
+            self._page_loading(url)
+            self.browser.get(url)
+        except BROWSER_ERRORS as e:
+            if not self.browser_failed(e):
+                raise
+            self.restart('{}: {}'.format(type(e).__name__, str(e).strip()))
+            self._page_loading(url)
+            self.browser.get(url)
+        if self._check_session:
+            # First page since a restart: did the old cookies work?
+            self._check_session = False
+            if self._signed_out():
+                self._sign_in()
+                self._page_loading(url)
+                self.browser.get(url)
+        self.navigations += 1
+
+    @property
+    def page_cache(self):
+        """
+        The tenant's PageCache, kept by its VhRest, so every session for
+        the tenant shares the snapshots and sees invalidate_pages().
+        """
+        return self.vr.page_cache
+
+    def read_page(self, url, harvest=None, ready_id=None, kind=None):
+        """
+        Reads a page which this code doesn't change, using self.page_cache:
+        if there's a current snapshot of what was read from url, it's
+        returned without loading the page at all. Otherwise, goes to url,
+        waits for element ready_id (if given), and returns harvest(self)
+        -- or the raw page_source, if harvest is None -- caching it.
+
+        harvest's result must not refer to page elements, which go stale
+        as soon as the browser moves on. kind distinguishes different
+        things read from the same page; it defaults to harvest's name.
+        """
+        if kind is None:
+            kind = harvest.__name__ if harvest is not None else 'page_source'
+        value = self.page_cache.get(url, kind)
+        if value is not None:
+            return value
+        self.goto(url)
+        if ready_id is not None:
+            self.wait_for_element(ready_id)
+        value = harvest(self) if harvest is not None else self.browser.page_source
+        self.page_cache.put(url, kind, value)
+        return value
+
+    def invalidate_pages(self, url_regex=None):
+        """
+        Forgets cached snapshots of pages whose URL matches url_regex;
+        call after changing something those pages show.
+        """
+        self.page_cache.invalidate(url_regex)
+
+    def login_to_vh(self):
+        """
+        Log in to FSFB VH.
+        Sets self.browser and self.main_window_handle
+        Throws exception if:
+          * open main VH page error
+          * login error
+          * problem finding controls (username or password fields, signin button)
+            or signin link
+        """
+        self._start_browser()
+        self._sign_in()
+
+    def _start_browser(self):
+        # Create a virtual display and an automated browser:
+        self.display = Display(visible=self.visible,size=(800,600))
+        self.display.start()
+        binary = FirefoxBinary('PATH TO FIREFOX BINARY')
+        self.browser = webdriver.Firefox(firefox_profile=self.profile.firefox_profile(),
+                firefox_binary=binary, capabilities=self.profile.capabilities())
+        self.navigations = 0
+
+    def _sign_in(self):
+        # Open login page:
+        self._page_loading(self.cfg.login['URL'])
+        self.browser.get(self.cfg.login['URL'])
+        # Proceed only when the required controls are present:
+        try:
+            login_button, uname_field, pwd_field = self.wait_for_elements([ self.cfg.login['BUTTON'],
+                    self.cfg.login['TXT_USER'], self.cfg.login['TXT_PASSWORD'] ])
+        except ElementsMissing as e:
+            # (Not logout(), which would wait for this very login if
+            # it's running in the warm-up.)
+            self._quit_browser()
+            raise Exception('Could not log in to Volunteer Hub! {}'.format(e))
+        # Fill in user name and password, and click login button:
+        uname_field.send_keys(self.cfg.username)
+        pwd_field.send_keys(self.cfg.password)
+        login_button.click()
+        self.wait_for_element_to_disappear(login_button)
+        self.main_window_handle = self.browser.current_window_handle
+
+    def _signed_out(self):
+        """
+        True if the browser has been sent to the login page.
+        """
+        login_path = urlparse(self.cfg.login['URL']).path.lower()
+        return urlparse(self.browser.current_url).path.lower() == login_path
+
+    def _quit_browser(self):
+        if self.browser is not None:
+            try:
+                self.browser.quit()
+            except BROWSER_ERRORS:
+                # It may well have crashed already.
+                pass
+            self.browser = None
+        if self.display is not None:
+            self.display.stop()
+            self.display = None
+
+    def browser_rss(self):
+        """
+        Memory used by Firefox (including its content processes) in MB,
+        or None if that can't be found out. Uses psutil if it's installed,
+        and /proc otherwise.
+        """
+        if self.browser is None:
+            return None
+        pid = self.browser.capabilities.get('moz:processID')
+        if pid is None:
+            return None
+        if psutil is not None:
+            try:
+                process = psutil.Process(pid)
+                processes = [ process ] + process.children(recursive=True)
+                return sum(p.memory_info().rss for p in processes) / 1048576.0
+            except psutil.Error:
+                return None
+        return _proc_rss_kb(pid) / 1024.0 if os.path.isdir('/proc') else None
+
+    def recycle_reason(self):
+        """
+        Why the browser should be restarted before the next navigation,
+        or None if it shouldn't.
+        """
+        if self.recycle_after and self.navigations >= self.recycle_after:
+            return 'after {} navigations'.format(self.navigations)
+        if self.recycle_rss_mb and self.navigations and self.navigations % self.rss_check_every == 0:
+            rss = self.browser_rss()
+            if rss is not None and rss > self.recycle_rss_mb:
+                return 'using {:.0f} MB'.format(rss)
+        return None
+
+    def restart(self, reason):
+        """
+        Replaces the browser with a new one. The session cookies are
+        carried over, so normally there's no need to log in again; if
+        they turn out not to work, goto() logs in.
+        """
+        print("Restarting browser ({})".format(reason))
+        cookies = None
+        try:
+            cookies = self.browser.get_cookies()
+        except BROWSER_ERRORS:
+            pass
+        self._quit_browser()
+        self.old_window_handle = None
+        self.restarts += 1
+        self._start_browser()
+        if not cookies:
+            self._sign_in()
+            return
+        # Cookies can only be set for the site the browser is on:
+        self._page_loading(self.cfg.login['URL'])
+        self.browser.get(self.cfg.login['URL'])
+        for cookie in cookies:
+            try:
+                self.browser.add_cookie(cookie)
+            except WebDriverException:
+                # (One for another subdomain, say.)
+                pass
+        self.main_window_handle = self.browser.current_window_handle
+        self._check_session = True
+
+    def recovering(self, operation, *args, **kwargs):
+        """
+        Returns operation(*args, **kwargs). If the browser fails while
+        it's running, restarts the browser and runs it once more -- so
+        only use this for operations which are safe to repeat.
+        """
+        try:
+            return operation(*args, **kwargs)
+        except BROWSER_ERRORS as e:
+            if not self.browser_failed(e):
+                raise
+            self.restart('{}: {}'.format(type(e).__name__, str(e).strip()))
+        return operation(*args, **kwargs)
+
+    def browser_failed(self, e):
+        """
+        True if exception e means the browser has died or can't be
+        reached, so it needs restarting; False if it's just a problem
+        with the page (NoSuchElementException, TimeoutException and the
+        like are WebDriverExceptions too), which a restart wouldn't fix.
+        """
+        if isinstance(e, BROWSER_GONE) or self.browser is None:
+            return True
+        # Anything else: see if the session still answers.
+        try:
+            self.browser.current_window_handle
+        except BROWSER_ERRORS:
+            return True
+        return False
+
+    def logout(self):
+        # Let a background login finish, so it can't leave a browser
+        # running after we've logged out:
+        try:
+            self.wait_for_warm_up()
+        except Exception:
+            pass
+        self._quit_browser()
+        if self._vr_leased:
+            self._vr_leased = False
+            self.vr.release()
+
+
+def _proc_rss_kb(pid):
+    """
+    Resident memory of process pid and all of its descendants, in kB,
+    from /proc (Linux only).
+    """
+    total = 0
+    try:
+        with open('/proc/{}/status'.format(pid)) as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    total += int(line.split()[1])
+        for task in os.listdir('/proc/{}/task'.format(pid)):
+            with open('/proc/{}/task/{}/children'.format(pid, task)) as children:
+                for child in children.read().split():
+                    total += _proc_rss_kb(int(child))
+    except (IOError, OSError, ValueError):
+        # The process went away, or this kernel doesn't list children.
+        pass
+    return total
@@ -0,0 +1,118 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+from .index import GroupTree, MembershipIndex
+
+
+class UserGroupCache(object):
+    """
+    One loaded copy of the user groups. VhRest fills a new one from the
+    API (add_from_json is the get_vh_list callback) and only then puts
+    it in place of the old one, so readers never see it half-filled.
+    Changes are made the same way, to a copy().
+
+        groups -- id -> { 'name', 'parent_id', 'description' }
+        ids -- name -> id
+        tree -- GroupTree over the ids
+    """
+    def __init__(self):
+        self.groups = {}
+        self.ids = {}
+        self.tree = GroupTree()
+
+    def copy(self):
+        c = UserGroupCache()
+        c.groups = dict(self.groups)
+        c.ids = dict(self.ids)
+        c.tree = self.tree.copy()
+        return c
+
+    def add(self, gid, name, parent_id, description=''):
+        self.groups[gid] = { 'name': name, 'description': description, 'parent_id': parent_id }
+        self.ids[name] = gid
+        self.tree.add(gid, parent_id)
+
+    def add_from_json(self, j):
+        self.add(j['UserGroupUid'], j['Name'], j.get('ParentUserGroupUid', None), j['Description'])
+
+
+class EventGroupCache(object):
+    """
+    Like UserGroupCache, for the event groups:
+
+        groups -- id -> { 'name', 'parent_id' }
+        ids -- name -> id
+        tree -- GroupTree over the ids
+    """
+    def __init__(self):
+        self.groups = {}
+        self.ids = {}
+        self.tree = GroupTree()
+
+    def copy(self):
+        c = EventGroupCache()
+        c.groups = dict(self.groups)
+        c.ids = dict(self.ids)
+        c.tree = self.tree.copy()
+        return c
+
+    def add_from_json(self, j):
+        gid = j['EventGroupUid']
+        parent_id = j.get('ParentEventGroupId', None)
+        self.groups[gid] = { 'name': j['Name'], 'parent_id': parent_id }
+        self.ids[j['Name']] = gid
+        self.tree.add(gid, parent_id)
+
+
+class UserCache(object):
+    """
+    One loaded copy of the users, filled and swapped in the same way
+    as UserGroupCache:
+
+        users -- id -> { 'username', 'group_ids', 'first_name', 'last_name' }
+        ids -- username -> id
+        memberships -- MembershipIndex from group id to user ids
+        synced_at -- when the API was last asked for changes (ISO 8601)
+    """
+    def __init__(self, synced_at):
+        self.users = {}
+        self.ids = {}
+        self.memberships = MembershipIndex()
+        self.synced_at = synced_at
+
+    def copy(self):
+        c = UserCache(self.synced_at)
+        c.users = dict(self.users)
+        c.ids = dict(self.ids)
+        c.memberships = self.memberships.copy()
+        return c
+
+    def add(self, uid, d):
+        """
+        Adds user uid with details d, or replaces the details of a user
+        already here, keeping ids and memberships in step.
+        """
+        old = self.users.get(uid)
+        if old is None:
+            self.memberships.add(uid, d['group_ids'])
+        else:
+            self.memberships.update(uid, old['group_ids'], d['group_ids'])
+            if self.ids.get(old['username']) == uid:
+                del self.ids[old['username']]
+        self.users[uid] = d
+        self.ids[d['username']] = uid
+
+    def add_from_json(self, u):
+        d = {}
+        d['username'] = u['Username']
+        d['group_ids'] = u['UserGroupMemberships']
+        """
+        TODO: Fix this bug. The next part will get the first and
+        last names of the emergency contact, instead of those of
+        the user, at least sometimes.
+        """
+        for a in u['FormAnswers']:
+            if 'LastName' in a:
+                d['last_name'] = a['LastName']
+                d['first_name'] = a['FirstName']
+                break
+        self.add(u['UserUid'], d)
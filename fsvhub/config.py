@@ -0,0 +1,24 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import configparser
+
+
+class VhConfig(object):
+    def __init__(self,user,password,config_file='vhconfig.cfg'):
+        self.username = user
+        self.password = password
+        self.cfg = configparser.SafeConfigParser(interpolation=None)
+        config_files_read = self.cfg.read(config_file)
+        if len(config_files_read) == 0:
+            raise Exception('Could not find config file {}'.format(config_file))
+        # For convenience, make sections of self.cfg attributes of self:
+        for s in self.cfg.sections():
+            setattr(self, s.lower(), self.cfg[s])
+
+    def tenant_key(self):
+        """
+        Identifies the VolunteerHub account this config talks to.
+        Objects which cache per-account data (VhRest, LandingPageApi)
+        keep one instance for each distinct key.
+        """
+        return (self.api['BASE_URL'], self.username)
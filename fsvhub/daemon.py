@@ -0,0 +1,258 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import importlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+
+from .config import VhConfig
+
+
+# Job name -> module providing run_job(vh_browser, args). The modules are
+# the command-line scripts, which must be importable from the directory
+# the daemon runs in.
+JOBS = {
+    'add_landing_pages': 'add_landing_pages_from_csv',
+    'add_user_groups': 'add_user_groups_from_csv',
+    'add_users': 'add_users_from_csv',
+    'clear_overflow': 'clear_overflow_checkboxes_in_events',
+    'export': 'export_data',
+    'list_expirations': 'list_event_expirations',
+    'sweep': 'sweep_events',
+    'transactions': 'do_transactions_from_csv',
+}
+
+
+def default_socket_path(config_file='vhconfig.cfg'):
+    """
+    [DAEMON] SOCKET from the config, or the VHW_DAEMON_SOCKET
+    environment variable if that is set.
+    """
+    path = os.environ.get('VHW_DAEMON_SOCKET')
+    if path:
+        return path
+    return VhConfig('', '', config_file).daemon['SOCKET']
+
+
+class _ThreadOutput(object):
+    """
+    Stands in for sys.stdout (or sys.stderr) while the daemon runs, so
+    each job's output goes back to the client which submitted it, even
+    though several jobs may run at once on different threads.
+    """
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def _target(self):
+        return getattr(self.local, 'stream', None) or self.default
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def flush(self):
+        self._target().flush()
+
+
+class _ClientStream(object):
+    """
+    File-like object sending whatever is written to it back to
+    the client, as { key: ... } JSON lines (key is "output" for
+    stdout, "error_output" for stderr).
+    """
+    def __init__(self, wfile, key='output'):
+        self.wfile = wfile
+        self.key = key
+
+    def write(self, s):
+        if s:
+            self.send({ self.key: s })
+        return len(s)
+
+    def flush(self):
+        pass
+
+    def send(self, msg):
+        self.wfile.write((json.dumps(msg) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+
+class _Session(object):
+    """
+    A logged-in VhBrowser for one tenant, and a lock so only one
+    job at a time uses it.
+    """
+    def __init__(self, vh_browser):
+        self.vh_browser = vh_browser
+        self.lock = threading.Lock()
+        # When the REST caches were last brought up to date (None: they
+        # haven't been used yet, so what the warm-up loaded is current):
+        self.refreshed = None
+
+
+class VhDaemon(object):
+    """
+    Keeps logged-in browsers and warm caches between jobs.
+
+    Each of the command-line scripts pays for starting Firefox, logging in
+    and loading the REST caches, and throws it all away when it finishes.
+    The daemon keeps one VhBrowser per tenant (username), started with
+    warm_up, and the VhRest and LandingPageApi instances that go with it.
+    Jobs are submitted over a Unix socket (see submit_job(), and the
+    --via-daemon option of the scripts), so back-to-back jobs start
+    right away. Jobs for one tenant run one at a time; jobs for different
+    tenants run at once.
+
+    Before each job, the REST caches the session has loaded are brought
+    up to date (VhRest.refresh()), so changes made by other people or
+    processes since the last job are seen -- unless they were refreshed
+    less than [DAEMON] REFRESH_AFTER seconds ago (default 0: every job).
+
+    Protocol: the client sends one JSON line,
+        { "job": name, "username": ..., "password": ..., "args": [ ... ] }
+    and the daemon answers with any number of { "output": text } (the
+    job's stdout) and { "error_output": text } (its stderr) lines, then
+    { "status": "ok" } or { "status": "error", "error": text }.
+    Besides the names in JOBS, the job may be "user_exists", "group_exists"
+    or "page_exists" (args: [ name ]), answered from the warm caches.
+    """
+    def __init__(self, socket_path, visible=False):
+        self.socket_path = socket_path
+        self.visible = visible
+        self.sessions = {}
+        self._sessions_lock = threading.Lock()
+        self.server = None
+        cfg = VhConfig('', '')
+        self.refresh_after = cfg.daemon.getfloat('REFRESH_AFTER', fallback=0) \
+                if cfg.cfg.has_section('DAEMON') else 0
+
+    def session(self, username, password):
+        from .browser import VhBrowser
+        with self._sessions_lock:
+            s = self.sessions.get(username)
+            if s is not None and s.vh_browser.cfg.password != password:
+                raise Exception("Wrong password for {}".format(username))
+            if s is None:
+                s = _Session(VhBrowser(username, password, visible=self.visible, warm_up=True))
+                self.sessions[username] = s
+            return s
+
+    def run_job(self, request):
+        """
+        Runs one job, with print() output going to the current thread's stream.
+        """
+        s = self.session(request['username'], request['password'])
+        job = request['job']
+        args = request.get('args', [])
+        with s.lock:
+            if s.refreshed is not None and time.time() - s.refreshed >= self.refresh_after:
+                s.vh_browser.vr.refresh()
+            s.refreshed = time.time()
+            if job in ('user_exists', 'group_exists', 'page_exists'):
+                from .webapi import UserApi, UserGroupApi, LandingPageApi
+                api = { 'user_exists': UserApi, 'group_exists': UserGroupApi,
+                        'page_exists': LandingPageApi }[job](s.vh_browser)
+                print(json.dumps(getattr(api, job)(args[0])))
+            elif job in JOBS:
+                module = importlib.import_module(JOBS[job])
+                module.run_job(s.vh_browser, args)
+            else:
+                raise Exception("Unknown job {}".format(job))
+
+    def serve_forever(self):
+        daemon = self
+        real_stdout = sys.stdout
+        real_stderr = sys.stderr
+        output = _ThreadOutput(real_stdout)
+        error_output = _ThreadOutput(real_stderr)
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stream = _ClientStream(self.wfile)
+                try:
+                    request = json.loads(self.rfile.readline().decode('utf-8'))
+                    output.local.stream = stream
+                    error_output.local.stream = _ClientStream(self.wfile, 'error_output')
+                    try:
+                        daemon.run_job(request)
+                    finally:
+                        output.local.stream = None
+                        error_output.local.stream = None
+                    stream.send({ 'status': 'ok' })
+                except Exception as e:
+                    traceback.print_exc(file=real_stdout)
+                    stream.send({ 'status': 'error', 'error': str(e) })
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        # Requests carry passwords; only this user may connect, from
+        # the moment the socket exists:
+        old_umask = os.umask(0o077)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(old_umask)
+        sys.stdout = output
+        sys.stderr = error_output
+        try:
+            self.server.serve_forever()
+        finally:
+            sys.stdout = real_stdout
+            sys.stderr = real_stderr
+            self.shutdown()
+
+    def shutdown(self):
+        if self.server is not None:
+            self.server.server_close()
+            self.server = None
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+        for s in self.sessions.values():
+            s.vh_browser.logout()
+        self.sessions = {}
+
+
+def submit_job(job, username, password, args=(), socket_path=None, out=None):
+    """
+    Sends a job to a running VhDaemon and copies its output to out
+    (default sys.stdout), and its error output to sys.stderr, as it
+    arrives. Returns True if the job succeeded.
+    """
+    out = out or sys.stdout
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(socket_path or default_socket_path())
+    try:
+        request = { 'job': job, 'username': username, 'password': password, 'args': list(args) }
+        sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        for line in sock.makefile('rb'):
+            msg = json.loads(line.decode('utf-8'))
+            if 'output' in msg:
+                out.write(msg['output'])
+                out.flush()
+            elif 'error_output' in msg:
+                sys.stderr.write(msg['error_output'])
+                sys.stderr.flush()
+            elif msg.get('status') == 'ok':
+                return True
+            else:
+                out.write("Job failed: {}\n".format(msg.get('error')))
+                return False
+        out.write("Lost connection to daemon\n")
+        return False
+    finally:
+        sock.close()
+
+
+def via_daemon(argv):
+    """
+    For the scripts' --via-daemon option: if argv contains it, returns
+    argv without it; otherwise returns None.
+    """
+    if '--via-daemon' not in argv:
+        return None
+    return [ a for a in argv if a != '--via-daemon' ]
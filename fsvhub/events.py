@@ -0,0 +1,151 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import array
+import bisect
+import datetime
+
+
+def parse_vh_time(s):
+    """
+    Parses a VolunteerHub timestamp such as '2016-03-31T08:30:00',
+    '2016-03-31T08:30:00.000' or '2016-03-31T08:30:00Z' into a naive
+    datetime. Any fractional seconds and UTC offset are ignored.
+    Returns None if s is empty.
+    """
+    if not s:
+        return None
+    s = s[:19]
+    return datetime.datetime.strptime(s, '%Y-%m-%dT%H:%M:%S')
+
+
+class Event(object):
+    """
+    One event, as parsed from the v1/events API. The original JSON
+    is kept in raw, for fields not pulled out here.
+    """
+    __slots__ = ('uid', 'name', 'start', 'end', 'group_id', 'raw')
+
+    def __init__(self, uid, name, start, end, group_id, raw):
+        self.uid = uid
+        self.name = name
+        self.start = start
+        self.end = end
+        self.group_id = group_id
+        self.raw = raw
+
+    def __repr__(self):
+        return 'Event({!r}, {!r}, {})'.format(self.uid, self.name, self.start)
+
+
+class EventStore(object):
+    """
+    Events between two times, kept sorted by start time so range
+    queries are a pair of binary searches rather than a scan.
+
+    Start times are held in an array of timestamps alongside the list
+    of Event objects, and there is one such pair per event group as
+    well, so "events in the next 30 days in Distribution Center" costs
+    two bisects on that group's array.
+
+    Build one with VhRest.event_store(); it covers the window it was
+    loaded for (earliest, latest -- latest may be None, meaning no end).
+    VhRest indexes the store before handing it out, so it isn't changed
+    after that and may be read by several threads at once; a store
+    filled some other way is indexed by its first query, which isn't
+    safe to make from more than one thread.
+    """
+    # Field names in the v1/events JSON:
+    UID_FIELD = 'EventUid'
+    NAME_FIELD = 'Name'
+    START_FIELD = 'StartTime'
+    END_FIELD = 'EndTime'
+    GROUP_FIELD = 'EventGroupUid'
+
+    def __init__(self, earliest, latest=None):
+        self.earliest = earliest
+        self.latest = latest
+        self._pending = []
+        self._starts = array.array('d')
+        self._events = []
+        self._groups = {}   # group id -> (array of start timestamps, list of Event)
+        self._by_uid = {}
+
+    def __len__(self):
+        return len(self._events) + len(self._pending)
+
+    def add_from_json(self, j):
+        """
+        Callback for VhRest.get_vh_list. Events are collected here and
+        sorted once, by index().
+        """
+        self._pending.append(Event(j.get(EventStore.UID_FIELD), j.get(EventStore.NAME_FIELD),
+                                   parse_vh_time(j.get(EventStore.START_FIELD)),
+                                   parse_vh_time(j.get(EventStore.END_FIELD)),
+                                   j.get(EventStore.GROUP_FIELD), j))
+
+    def index(self):
+        """
+        Sorts and indexes the events added since the last call.
+        """
+        if not self._pending:
+            return
+        events = self._events + [ e for e in self._pending if e.start is not None ]
+        self._pending = []
+        events.sort(key=lambda e: e.start)
+        self._events = events
+        self._starts = array.array('d', [ e.start.timestamp() for e in events ])
+        self._groups = {}
+        self._by_uid = dict([ (e.uid, e) for e in events ])
+        for e, t in zip(events, self._starts):
+            starts, group_events = self._groups.setdefault(e.group_id, (array.array('d'), []))
+            starts.append(t)
+            group_events.append(e)
+
+    def covers(self, earliest, latest=None):
+        """
+        True if this store was loaded for a window including earliest..latest.
+        """
+        if earliest < self.earliest:
+            return False
+        if self.latest is None:
+            return True
+        return latest is not None and latest <= self.latest
+
+    def between(self, start=None, end=None, group_ids=None):
+        """
+        Events starting at or after start and before end (either may be
+        None for no limit), in start time order. If group_ids is given,
+        only events in those event groups are returned.
+        """
+        self.index()
+        if group_ids is None:
+            return self._slice(self._starts, self._events, start, end)
+        ret_list = []
+        for gid in group_ids:
+            if gid in self._groups:
+                starts, events = self._groups[gid]
+                ret_list.extend(self._slice(starts, events, start, end))
+        if len(group_ids) > 1:
+            ret_list.sort(key=lambda e: e.start)
+        return ret_list
+
+    def upcoming(self, days, group_ids=None, now=None):
+        """
+        Events starting within the next days days.
+        """
+        now = now or datetime.datetime.now()
+        return self.between(now, now + datetime.timedelta(days=days), group_ids)
+
+    def find(self, uid):
+        self.index()
+        return self._by_uid.get(uid)
+
+    def __iter__(self):
+        self.index()
+        return iter(self._events)
+
+    @staticmethod
+    def _slice(starts, events, start, end):
+        lo = 0 if start is None else bisect.bisect_left(starts, start.timestamp())
+        hi = len(starts) if end is None else bisect.bisect_left(starts, end.timestamp())
+        return events[lo:hi]
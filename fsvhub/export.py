@@ -0,0 +1,150 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import csv
+import gzip
+import io
+import json
+import os
+import os.path
+import sys
+
+from .state import LocalState
+
+# Collection name -> (api call, query parameters), for the collections
+# VhRest.get_vh_list() can page through:
+COLLECTIONS = {
+    'users': ('v2/users', { 'query': 'LastUpdate', 'earliestLastUpdate': '1970-01-01T00:00:00' }),
+    'user_groups': ('v1/userGroups', {}),
+    'event_groups': ('v1/eventGroups', {}),
+    'events': ('v1/events', { 'query': 'Time', 'earliestTime': '1970-01-01T00:00:00' }),
+}
+
+FORMATS = ('jsonl', 'csv')
+
+
+class Exporter(object):
+    """
+    Writes whole collections to files, a page at a time, so memory use
+    doesn't grow with the size of the tenant:
+
+        ex = Exporter(vr)
+        ex.export('users', 'out/users.jsonl.gz')
+
+    The format is jsonl (one JSON record per line) or csv (one column per
+    top-level field of the first record; lists and dicts are written as
+    JSON), and is taken from the file name, which may end in .gz for
+    gzip. Each page of a gzipped file is its own gzip member, so the file
+    is readable (gzip, zcat) at every page boundary.
+
+    After each page, the file is flushed to disk and a checkpoint -- the
+    records and bytes written so far, and the page size -- is saved in
+    the local state ('export'). If the export is interrupted, running it
+    again for the same file cuts off anything written after the last
+    checkpoint and carries on from the next page. A finished export is
+    started over. Records changed between the runs may be missed or
+    repeated, as the API has no snapshots.
+    """
+    def __init__(self, vr, state=None):
+        self.vr = vr
+        if state is None:
+            state = LocalState.for_tenant(vr.cfg, 'export')
+        self.state = state
+
+    @staticmethod
+    def file_format(path):
+        """
+        (format, gzipped) for path, from its extension.
+        """
+        name = path[:-3] if path.endswith('.gz') else path
+        fmt = os.path.splitext(name)[1].lstrip('.')
+        if fmt not in FORMATS:
+            raise ValueError("Can't tell export format of {} -- use .jsonl or .csv (optionally .gz)".format(path))
+        return fmt, name != path
+
+    def export(self, name, path, params=None):
+        """
+        Exports collection name (see COLLECTIONS) to path, resuming an
+        interrupted export to the same file. params are added to the
+        query (for example, { 'earliestTime': ..., 'latestTime': ... }
+        for events). Returns the number of records in the file.
+        """
+        api_call, query = COLLECTIONS[name]
+        query = dict(query, **(params or {}))
+        fmt, gzipped = Exporter.file_format(path)
+        key = os.path.abspath(path)
+        job = { 'collection': name, 'query': query, 'format': fmt, 'gzip': gzipped }
+        cp = self.state.get(key)
+        if cp is not None and not cp['done'] and cp['job'] == job and os.path.exists(path) \
+                and os.path.getsize(path) >= cp['bytes']:
+            print("Resuming {} export to {} after {} records".format(name, path, cp['records']))
+        else:
+            cp = { 'job': job, 'records': 0, 'bytes': 0, 'page_size': None, 'fields': None, 'done': False }
+        with open(path, 'r+b' if cp['bytes'] else 'wb') as outfile:
+            # Anything after the checkpoint is from a page that didn't finish:
+            outfile.truncate(cp['bytes'])
+            outfile.seek(cp['bytes'])
+            page = []
+
+            def page_done(offset, page_size):
+                if cp['fields'] is None and fmt == 'csv' and page:
+                    cp['fields'] = list(page[0].keys())
+                data = self.render(page, fmt, cp['fields'], header=cp['records'] == 0)
+                if data:
+                    outfile.write(gzip.compress(data) if gzipped else data)
+                outfile.flush()
+                os.fsync(outfile.fileno())
+                cp['records'] = offset
+                cp['bytes'] = outfile.tell()
+                cp['page_size'] = page_size
+                self.checkpoint(key, cp)
+                del page[:]
+
+            self.vr.get_vh_list(api_call=api_call, data=query, func=page.append,
+                    offset=cp['records'], page_size=cp['page_size'], page_done=page_done)
+        cp['done'] = True
+        self.checkpoint(key, cp)
+        return cp['records']
+
+    def export_records(self, records, path):
+        """
+        Writes records (a list of dicts), all at once, to path; for
+        things not available through the API, such as the landing pages.
+        Returns the number of records.
+        """
+        fmt, gzipped = Exporter.file_format(path)
+        fields = list(records[0].keys()) if records and fmt == 'csv' else None
+        data = self.render(records, fmt, fields, header=True)
+        with open(path, 'wb') as outfile:
+            outfile.write(gzip.compress(data) if gzipped else data)
+        return len(records)
+
+    def checkpoint(self, key, cp):
+        self.state.set(key, cp)
+        self.state.save()
+
+    def render(self, records, fmt, fields, header=False):
+        """
+        records, as the bytes to write to a fmt file.
+        """
+        if fmt == 'jsonl':
+            return ''.join([ json.dumps(r) + '\n' for r in records ]).encode('utf-8')
+        if not records:
+            return b''
+        out = io.StringIO()
+        writer = csv.writer(out)
+        if header:
+            writer.writerow(fields)
+        extra = set()
+        for r in records:
+            extra.update(k for k in r if k not in fields)
+            writer.writerow([ self.cell(r.get(f)) for f in fields ])
+        if extra:
+            sys.stderr.write("Not in the CSV columns, so not exported: {}\n".format(', '.join(sorted(extra))))
+        return out.getvalue().encode('utf-8')
+
+    def cell(self, value):
+        if isinstance(value, (list, dict)):
+            return json.dumps(value)
+        if value is None:
+            return ''
+        return value
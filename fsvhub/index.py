@@ -0,0 +1,256 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import array
+import bisect
+
+
+class GroupTree(object):
+    """
+    Parent/child index over a collection of groups (user groups or
+    event groups), keyed by group id.
+
+    Children lists are kept as groups are added, and each group's
+    path from its root is computed once and cached, so:
+        path(), ancestors(), depth(), is_under() -- proportional to
+            the group's depth, and constant once cached
+        children() -- constant
+        descendants() -- proportional to the number of descendants
+    None of them scan the whole collection.
+
+    Groups may be added in any order; a parent which hasn't been
+    added yet is simply treated as unknown until it is.
+    """
+    def __init__(self):
+        self._parent = {}   # id -> parent id, or None for a top-level group
+        self._children = {} # id -> list of child ids
+        self._paths = {}    # id -> tuple of ids, root first, ending with id
+
+    def __contains__(self, gid):
+        return gid in self._parent
+
+    def __len__(self):
+        return len(self._parent)
+
+    def add(self, gid, parent_id=None):
+        """
+        Adds a group, or moves an existing one to a new parent.
+        """
+        if gid in self._parent:
+            old_parent = self._parent[gid]
+            if old_parent == parent_id:
+                return
+            if old_parent is not None:
+                self._children[old_parent].remove(gid)
+            self._forget_paths(gid)
+        elif self._children.get(gid):
+            # Already known as somebody's parent; their cached
+            # paths stopped short of this group.
+            self._forget_paths(gid)
+        self._parent[gid] = parent_id
+        self._children.setdefault(gid, [])
+        if parent_id is not None:
+            self._children.setdefault(parent_id, []).append(gid)
+
+    def copy(self):
+        """
+        A separate GroupTree with the same groups.
+        """
+        t = GroupTree()
+        t._parent = dict(self._parent)
+        t._children = dict((g, list(c)) for g, c in self._children.items())
+        t._paths = dict(self._paths)
+        return t
+
+    def parent(self, gid):
+        return self._parent.get(gid)
+
+    def children(self, gid):
+        return list(self._children.get(gid, []))
+
+    def roots(self):
+        return [ g for g, p in self._parent.items() if p is None or p not in self._parent ]
+
+    def path(self, gid):
+        """
+        Returns a tuple of ids from the top-level group down to gid,
+        or an empty tuple if gid is unknown.
+        """
+        p = self._paths.get(gid)
+        if p is not None:
+            return p
+        # Walk up to the nearest group whose path is already cached
+        # (or to the top), then fill in the cache on the way back down.
+        chain = []
+        node = gid
+        while node in self._parent and node not in self._paths:
+            if node in chain:   # a cycle in the data -- stop here
+                break
+            chain.append(node)
+            node = self._parent[node]
+        p = self._paths.get(node, ())
+        for n in reversed(chain):
+            p = p + (n,)
+            self._paths[n] = p
+        return self._paths.get(gid, ())
+
+    def ancestors(self, gid):
+        """
+        Ids of gid's parent, grandparent and so on, nearest first.
+        """
+        return list(reversed(self.path(gid)[:-1]))
+
+    def depth(self, gid):
+        """
+        0 for a top-level group, 1 for its children and so on;
+        None if gid is unknown.
+        """
+        p = self.path(gid)
+        return len(p) - 1 if p else None
+
+    def is_under(self, gid, ancestor_id):
+        """
+        True if ancestor_id is a parent, grandparent, etc. of gid.
+        """
+        return gid != ancestor_id and ancestor_id in self.path(gid)
+
+    def descendants(self, gid):
+        """
+        Ids of every group below gid, in depth-first order.
+        """
+        ret_list = []
+        stack = list(reversed(self._children.get(gid, [])))
+        while stack:
+            g = stack.pop()
+            ret_list.append(g)
+            stack.extend(reversed(self._children.get(g, [])))
+        return ret_list
+
+    def _forget_paths(self, gid):
+        self._paths.pop(gid, None)
+        for g in self.descendants(gid):
+            self._paths.pop(g, None)
+
+
+class MembershipIndex(object):
+    """
+    Inverted index from group id to the users in that group.
+
+    Each user id is given a small integer the first time it is seen,
+    and each group's members are kept as a sorted array of those
+    integers, which is much more compact than a list or set of id
+    strings. Bulk loading appends in increasing order, so the arrays
+    stay sorted without any extra work; later updates use bisect.
+
+        count() -- constant
+        is_member() -- logarithmic in the group's size
+        intersection() -- proportional to the smallest group's size
+    """
+    def __init__(self):
+        self._numbers = {}  # user id -> integer
+        self._user_ids = [] # integer -> user id
+        self._members = {}  # group id -> array of integers, sorted
+
+    def _number(self, uid):
+        n = self._numbers.get(uid)
+        if n is None:
+            n = len(self._user_ids)
+            self._numbers[uid] = n
+            self._user_ids.append(uid)
+        return n
+
+    def add(self, uid, group_ids):
+        """
+        Records uid as a member of each group in group_ids.
+        """
+        n = self._number(uid)
+        for gid in group_ids:
+            members = self._members.get(gid)
+            if members is None:
+                members = self._members[gid] = array.array('l')
+            if members and members[-1] >= n:
+                # Not a new user -- insert in order, unless already there:
+                i = bisect.bisect_left(members, n)
+                if i == len(members) or members[i] != n:
+                    members.insert(i, n)
+            else:
+                members.append(n)
+
+    def remove(self, uid, group_ids):
+        """
+        Removes uid from each group in group_ids.
+        """
+        n = self._numbers.get(uid)
+        if n is None:
+            return
+        for gid in group_ids:
+            members = self._members.get(gid)
+            if members:
+                i = bisect.bisect_left(members, n)
+                if i < len(members) and members[i] == n:
+                    del members[i]
+
+    def update(self, uid, old_group_ids, new_group_ids):
+        """
+        Changes uid's memberships from old_group_ids to new_group_ids.
+        """
+        old = set(old_group_ids)
+        new = set(new_group_ids)
+        self.remove(uid, old - new)
+        self.add(uid, new - old)
+
+    def copy(self):
+        """
+        A separate MembershipIndex with the same memberships.
+        """
+        m = MembershipIndex()
+        m._numbers = dict(self._numbers)
+        m._user_ids = list(self._user_ids)
+        m._members = dict((g, array.array('l', a)) for g, a in self._members.items())
+        return m
+
+    def count(self, gid):
+        return len(self._members.get(gid, ()))
+
+    def members(self, gid):
+        """
+        Ids of the users in group gid.
+        """
+        return [ self._user_ids[n] for n in self._members.get(gid, ()) ]
+
+    def is_member(self, uid, gid):
+        n = self._numbers.get(uid)
+        members = self._members.get(gid)
+        if n is None or not members:
+            return False
+        i = bisect.bisect_left(members, n)
+        return i < len(members) and members[i] == n
+
+    def intersection(self, *gids):
+        """
+        Ids of the users who are in every one of the groups gids.
+        """
+        return [ self._user_ids[n] for n in self._intersect(gids) ]
+
+    def intersection_count(self, *gids):
+        return len(self._intersect(gids))
+
+    def _intersect(self, gids):
+        if not gids:
+            return []
+        arrays = sorted([ self._members.get(g, ()) for g in gids ], key=len)
+        result = list(arrays[0])
+        for members in arrays[1:]:
+            if not result:
+                break
+            keep = []
+            lo = 0
+            # Both sides are sorted, so each search can start where
+            # the previous one ended:
+            for n in result:
+                lo = bisect.bisect_left(members, n, lo)
+                if lo == len(members):
+                    break
+                if members[lo] == n:
+                    keep.append(n)
+            result = keep
+        return result
@@ -0,0 +1,198 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import csv
+import re
+
+
+class CsvField(object):
+    """
+    Declares one column of a CSV input file.
+
+        name -- column header
+        required -- row is rejected if the value is blank
+        default -- value used when the column is blank or absent
+        kind -- 'text', 'phone' (ten digits, normalized to 555-555-5555),
+            'flag' (true if the value starts with one of '1yYtT'),
+            or 'list' (comma-delimited, normalized to a list of stripped strings)
+        references -- 'user_group' or 'event_group': each value must name
+            a group which already exists in Volunteer Hub, or which
+            is created by this or an earlier row
+        creates -- 'user_group' or 'event_group': the value names a group
+            which processing this row will create
+        also_allow -- names accepted by references even though they are
+            not groups, for example 'All Events'
+    """
+    truth_markers = '1yYtT'
+    phone_regex = re.compile(r'\D')
+
+    def __init__(self, name, required=False, default='', kind='text',
+                 references=None, creates=None, also_allow=()):
+        self.name = name
+        self.required = required
+        self.default = default
+        self.kind = kind
+        self.references = references
+        self.creates = creates
+        self.also_allow = also_allow
+
+    def normalize(self, value):
+        """
+        Returns the normalized value. Raises ValueError if the
+        value is not valid for this field's kind.
+        """
+        if self.kind == 'phone':
+            if value == '':
+                return ''
+            digits = CsvField.phone_regex.sub('', value)
+            if len(digits) != 10:
+                raise ValueError("'{}' is not a ten-digit phone number".format(value))
+            return '{}-{}-{}'.format(digits[:3], digits[3:6], digits[6:])
+        if self.kind == 'flag':
+            return value != '' and value[0] in CsvField.truth_markers
+        if self.kind == 'list':
+            return [ v.strip() for v in value.split(',') if v.strip() != '' ]
+        return value
+
+
+class CsvRowError(object):
+    def __init__(self, line_number, field, message):
+        self.line_number = line_number
+        self.field = field
+        self.message = message
+
+    def __str__(self):
+        if self.field is None:
+            return "Line {}: {}".format(self.line_number, self.message)
+        return "Line {}, field {}: {}".format(self.line_number, self.field, self.message)
+
+
+class CsvValidationError(Exception):
+    """
+    Raised by CsvSchema.check() with every problem found in the file,
+    so they can all be fixed at once.
+    """
+    def __init__(self, filename, errors):
+        self.filename = filename
+        self.errors = errors
+        super().__init__("{} bad row(s) in {}".format(len(errors), filename))
+
+    def report(self):
+        return '\n'.join([ str(self) ] + [ '\t' + str(e) for e in self.errors ])
+
+
+class CsvSchema(object):
+    """
+    Declarative description of a CSV input file (a list of CsvField).
+
+    Rows are read as a stream, so memory use does not depend on
+    the size of the file. Typical use, from one of the scripts:
+
+        schema = CsvSchema([ CsvField('name', required=True, creates='user_group'), ... ])
+        schema.check(input_filename, VhRest(cfg))   # before launching the browser
+        for line_number, row in schema.rows(input_filename):
+            ...
+
+    Group names are checked against the VhRest caches, which
+    are loaded with the REST API and don't need a browser.
+    Like Volunteer Hub's own drop-downs, name matching is case-insensitive.
+    """
+    def __init__(self, fields):
+        self.fields = fields
+        # Work out once which fields take part in reference checks,
+        # so validating a large file only does set lookups per row:
+        self._creators = [ f for f in fields if f.creates ]
+        self._referrers = [ (f, set([ a.upper() for a in f.also_allow ]))
+                            for f in fields if f.references ]
+
+    def rows(self, filename):
+        """
+        Generator yielding (line_number, row) for each data row, with values
+        stripped, defaults filled in and each field normalized. Invalid
+        values are left as read -- call check() first to reject them.
+        """
+        with open(filename, 'r', newline='') as infile:
+            reader = csv.DictReader(infile)
+            for row in reader:
+                out, _ = self._normalize(row)
+                yield reader.line_num, out
+
+    def validate(self, filename, vh_rest=None, each_row=None):
+        """
+        Reads the whole file and returns a list of CsvRowError,
+        empty if every row is good. References to groups are only
+        checked if vh_rest is given. each_row, if given, is called
+        as each_row(line_number, row) with each normalized row, so
+        the caller can gather what it needs without reading the file
+        again.
+        """
+        known = {}
+        if vh_rest is not None:
+            known = self._known_names(vh_rest)
+        errors = []
+        with open(filename, 'r', newline='') as infile:
+            reader = csv.DictReader(infile)
+            missing = [ f.name for f in self.fields
+                        if f.required and f.name not in (reader.fieldnames or []) ]
+            if missing:
+                return [ CsvRowError(1, None, "Missing column(s): {}".format(', '.join(missing))) ]
+            for row in reader:
+                out, row_errors = self._normalize(row)
+                for field, message in row_errors:
+                    errors.append(CsvRowError(reader.line_num, field, message))
+                if vh_rest is not None:
+                    errors.extend(self._check_references(reader.line_num, out, known))
+                if each_row is not None:
+                    each_row(reader.line_num, out)
+        return errors
+
+    def check(self, filename, vh_rest=None, each_row=None):
+        """
+        Like validate(), but raises CsvValidationError if there are any errors.
+        """
+        errors = self.validate(filename, vh_rest, each_row)
+        if errors:
+            raise CsvValidationError(filename, errors)
+
+    def _normalize(self, row):
+        out = {}
+        errors = []
+        for f in self.fields:
+            value = row.get(f.name) or ''
+            value = value.strip()
+            if value == '':
+                if f.required:
+                    errors.append((f.name, "Required field not present"))
+                value = f.default
+            try:
+                out[f.name] = f.normalize(value)
+            except ValueError as e:
+                errors.append((f.name, str(e)))
+                out[f.name] = value
+        return out, errors
+
+    def _known_names(self, vh_rest):
+        known = {}
+        kinds = set([ f.references for f, allowed in self._referrers ])
+        if 'user_group' in kinds:
+            known['user_group'] = set([ g['name'].strip().upper() for g in vh_rest.user_groups.values() ])
+        if 'event_group' in kinds:
+            known['event_group'] = set([ g['name'].strip().upper() for g in vh_rest.event_groups.values() ])
+        return known
+
+    def _check_references(self, line_number, row, known):
+        errors = []
+        # Groups created by this row may be referenced by the same row,
+        # for example team_name in leader_groups:
+        for f in self._creators:
+            if f.creates in known and row[f.name]:
+                known[f.creates].add(row[f.name].upper())
+        for f, allowed in self._referrers:
+            if f.references not in known:
+                continue
+            values = row[f.name] if f.kind == 'list' else [ row[f.name] ]
+            for v in values:
+                name = v.upper()
+                if name and name not in known[f.references] and name not in allowed:
+                    errors.append(CsvRowError(line_number, f.name,
+                            "Unknown {} '{}'".format(f.references.replace('_', ' '), v)))
+        return errors
@@ -0,0 +1,27 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def decoder(name='auto'):
+    """
+    Returns a function turning a JSON document (bytes) into Python
+    objects. name is 'orjson', 'json' (the standard library), or 'auto':
+    orjson if it's installed, json otherwise.
+    """
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'json'
+    if name == 'orjson':
+        if orjson is None:
+            raise Exception("JSON decoder orjson is not installed")
+        return orjson.loads
+    if name == 'json':
+        # json.loads() takes bytes too, and works out the encoding itself.
+        return json.loads
+    raise Exception("Unknown JSON decoder {}".format(name))
+
@@ -0,0 +1,77 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import re
+import threading
+import time
+
+
+class PageCache(object):
+    """
+    Snapshots of read-only pages, so pages which are read several times
+    (the landing page list, an event's Registered Users page) are only
+    loaded in the browser once.
+
+    A snapshot is whatever was read from the page -- the parsed result,
+    or the raw page_source -- stored under (url, kind), where kind names
+    what was read. How long a snapshot stays good depends on the URL:
+    each rule is a (regex, seconds) pair, the first rule whose regex is
+    found in the URL applies, and URLs which match no rule aren't cached.
+    The rules come from the [PAGE_CACHE] section of the config, one per
+    line, as 'NAME = seconds regex'.
+
+    Code which changes something in Volunteer Hub should call
+    invalidate() for the pages that show it.
+    """
+    def __init__(self, rules=()):
+        self.rules = [ (re.compile(r), ttl) for r, ttl in rules ]
+        self._entries = {}  # (url, kind) -> (expires, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def from_config(cfg):
+        rules = []
+        if cfg.cfg.has_section('PAGE_CACHE'):
+            for name, value in cfg.cfg.items('PAGE_CACHE'):
+                ttl, regex = value.split(None, 1)
+                rules.append((regex.strip(), float(ttl)))
+        return PageCache(rules)
+
+    def ttl(self, url):
+        for regex, ttl in self.rules:
+            if regex.search(url):
+                return ttl
+        return 0
+
+    def get(self, url, kind='page_source'):
+        """
+        Returns the snapshot, or None if there is no current one.
+        """
+        with self._lock:
+            entry = self._entries.get((url, kind))
+            if entry is not None and entry[0] > time.time():
+                self.hits += 1
+                return entry[1]
+            self._entries.pop((url, kind), None)
+            self.misses += 1
+            return None
+
+    def put(self, url, kind, value):
+        ttl = self.ttl(url)
+        if ttl > 0:
+            with self._lock:
+                self._entries[(url, kind)] = (time.time() + ttl, value)
+
+    def invalidate(self, url_regex=None):
+        """
+        Drops the snapshots of every URL in which url_regex is found
+        (all of them, if url_regex is None).
+        """
+        with self._lock:
+            if url_regex is None:
+                self._entries = {}
+                return
+            patt = re.compile(url_regex)
+            for key in [ k for k in self._entries if patt.search(k[0]) ]:
+                del self._entries[key]
@@ -0,0 +1,142 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import threading
+
+from .state import LocalState
+
+
+class PageSizer(object):
+    """
+    Picks the pageSize for each page VhRest.get_vh_list() asks for, per
+    endpoint (api call).
+
+    Sizes are REC_PER_PAGE times a power of two, between PAGE_SIZE_MIN
+    and PAGE_SIZE_MAX. After each full page, if twice the page's latency
+    and payload would still be within PAGE_LATENCY_TARGET seconds and
+    PAGE_BYTES_TARGET bytes, the next step up is tried; if either target
+    was exceeded, the next step down. The API numbers pages, not records,
+    so the size only grows when the records read so far are a whole
+    number of the bigger pages; with power-of-two steps, shrinking always
+    lines up.
+
+    The server may serve fewer records per page than were asked for. So
+    a short page from a size bigger than any the endpoint is known to
+    serve in full might be a cap, not the end of the data; get_vh_list()
+    asks for the rest again, from the same offset, at the biggest size
+    it has served (see served()); if there turn out to be records past
+    the short page's end, limit() keeps the endpoint's sizes under the
+    cap from then on.
+
+    The biggest size which came back full in a pull is kept in the local
+    state ('page_sizes'), and the next pull of that endpoint starts from
+    it.
+    The settings are in the [API] section of the config; with
+    ADAPTIVE_PAGE_SIZE off, every page is REC_PER_PAGE records.
+    """
+    def __init__(self, base, minimum=None, maximum=None, latency_target=2.0,
+                 bytes_target=2000000, adaptive=True, state=None):
+        self.base = base
+        self.latency_target = latency_target
+        self.bytes_target = bytes_target
+        self.adaptive = adaptive
+        self.state = state
+        minimum = minimum or base
+        maximum = maximum or base
+        # The sizes which can be used, smallest first:
+        self.sizes = [ base ]
+        while self.sizes[0] % 2 == 0 and self.sizes[0] // 2 >= minimum:
+            self.sizes.insert(0, self.sizes[0] // 2)
+        while self.sizes[-1] * 2 <= maximum:
+            self.sizes.append(self.sizes[-1] * 2)
+        # endpoint -> biggest size it's known to serve in full:
+        self._served = {}
+        # endpoint -> biggest size to ask it for, if it has a cap:
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def from_config(cfg):
+        api = cfg.api
+        base = api.getint('REC_PER_PAGE')
+        state = None
+        if cfg.cfg.has_section('STATE'):
+            state = LocalState.for_tenant(cfg, 'page_sizes')
+        return PageSizer(base,
+                minimum=api.getint('PAGE_SIZE_MIN', fallback=base),
+                maximum=api.getint('PAGE_SIZE_MAX', fallback=base),
+                latency_target=api.getfloat('PAGE_LATENCY_TARGET', fallback=2.0),
+                bytes_target=api.getint('PAGE_BYTES_TARGET', fallback=2000000),
+                adaptive=api.getboolean('ADAPTIVE_PAGE_SIZE', fallback=False),
+                state=state)
+
+    def start(self, endpoint):
+        """
+        The size for the first page of a pull from endpoint.
+        """
+        if not self.adaptive or self.state is None:
+            return self.base
+        with self._lock:
+            size = self.state.get(endpoint)
+            limit = self._limits.get(endpoint)
+        if size not in self.sizes or (limit is not None and size > limit):
+            return self.base
+        return size
+
+    def next_size(self, endpoint, size, offset, seconds, nbytes):
+        """
+        The size for the next page, given that a full page of size
+        records, ending at record offset, took seconds and was nbytes long.
+        """
+        if not self.adaptive or size not in self.sizes:
+            # (A size from elsewhere -- say, a resumed export made with
+            # other settings -- is kept, since steps from it might not
+            # line up with the offset.)
+            return size
+        i = self.sizes.index(size)
+        if seconds > self.latency_target or nbytes > self.bytes_target:
+            return self.sizes[max(i - 1, 0)]
+        with self._lock:
+            limit = self._limits.get(endpoint)
+        if i + 1 < len(self.sizes) and 2 * seconds <= self.latency_target \
+                and 2 * nbytes <= self.bytes_target and offset % self.sizes[i + 1] == 0 \
+                and (limit is None or self.sizes[i + 1] <= limit):
+            return self.sizes[i + 1]
+        return size
+
+    def served(self, endpoint, size=None):
+        """
+        The biggest page size endpoint is known to serve in full (at
+        least the base size, which it always has); if size is given,
+        first records that it served a full page of size records.
+        """
+        with self._lock:
+            known = max(self._served.get(endpoint, self.base), size or 0)
+            self._served[endpoint] = known
+            return known
+
+    def limit(self, endpoint, count):
+        """
+        Records that endpoint served only count records for a bigger
+        page, so no bigger pages than that are asked for again.
+        """
+        fits = [ size for size in self.sizes if size <= count ]
+        with self._lock:
+            self._limits[endpoint] = fits[-1] if fits else self.sizes[0]
+
+    def finish(self, endpoint, size):
+        """
+        Remembers size, the biggest page size which came back full in a
+        pull from endpoint, for the next pull. None (no full page) leaves
+        what was remembered before.
+        """
+        if not self.adaptive or self.state is None or size is None:
+            return
+        with self._lock:
+            if self.state.get(endpoint) == size:
+                return
+            self.state.set(endpoint, size)
+            try:
+                self.state.save()
+            except (IOError, OSError) as e:
+                # Only a tuning hint; not worth failing the pull over.
+                print("Could not save page sizes: {}".format(e))
@@ -0,0 +1,108 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import os.path
+from urllib.parse import quote
+
+from selenium import webdriver
+from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+
+
+class BrowserProfile(object):
+    """
+    How VhBrowser's Firefox is set up.
+
+    The automation only reads ids and values from the DOM, so the lean
+    profile stops Firefox loading what it doesn't need: images and web
+    fonts (and, optionally, stylesheets), and anything at all from the
+    domains in block_domains -- analytics, chat widgets and so on -- which
+    are sent to a dead proxy by a PAC script. page_load_strategy 'eager'
+    makes browser.get() return once the document has been parsed, instead
+    of after every subresource has loaded; the waits for the elements we
+    actually use take care of the rest. Firefox's disk cache is kept in
+    cache_dir, so static files fetched in one run are reused by the next.
+
+    The settings come from the [BROWSER] section of the config; with
+    lean False, Firefox is started as it always was.
+    """
+    # Nothing listens on the discard port, so blocked requests fail at once:
+    DEAD_PROXY = 'PROXY 127.0.0.1:9'
+
+    def __init__(self, lean=True, block_images=True, block_fonts=True, block_css=False,
+                 block_domains=(), page_load_strategy='eager', cache_dir=None, cache_mb=256):
+        self.lean = lean
+        self.block_images = block_images
+        self.block_fonts = block_fonts
+        self.block_css = block_css
+        self.block_domains = tuple(block_domains)
+        self.page_load_strategy = page_load_strategy
+        self.cache_dir = cache_dir
+        self.cache_mb = cache_mb
+
+    @staticmethod
+    def from_config(cfg, lean=None):
+        """
+        lean, if given, overrides LEAN_PROFILE in the config.
+        """
+        if not cfg.cfg.has_section('BROWSER'):
+            return BrowserProfile(lean=bool(lean))
+        b = cfg.cfg['BROWSER']
+        if lean is None:
+            lean = b.getboolean('LEAN_PROFILE', fallback=False)
+        cache_dir = b.get('CACHE_DIR', fallback='')
+        return BrowserProfile(lean=lean,
+                block_images=b.getboolean('BLOCK_IMAGES', fallback=True),
+                block_fonts=b.getboolean('BLOCK_FONTS', fallback=True),
+                block_css=b.getboolean('BLOCK_CSS', fallback=False),
+                block_domains=b.get('BLOCK_DOMAINS', fallback='').split(),
+                page_load_strategy=b.get('PAGE_LOAD_STRATEGY', fallback='eager'),
+                cache_dir=os.path.abspath(cache_dir) if cache_dir else None,
+                cache_mb=b.getint('CACHE_MB', fallback=256))
+
+    def pac_script(self):
+        """
+        A proxy auto-config script sending requests for block_domains
+        (and their subdomains) nowhere.
+        """
+        tests = ' || '.join('dnsDomainIs(host, ".{0}") || host == "{0}"'.format(d.lstrip('.'))
+                            for d in self.block_domains)
+        return ('function FindProxyForURL(url, host) {{ if ({}) return "{}"; return "DIRECT"; }}'
+                .format(tests, BrowserProfile.DEAD_PROXY))
+
+    def firefox_profile(self):
+        """
+        A selenium FirefoxProfile, or None for Firefox's defaults.
+        """
+        if not self.lean:
+            return None
+        profile = webdriver.FirefoxProfile()
+        if self.block_images:
+            profile.set_preference('permissions.default.image', 2)
+        if self.block_fonts:
+            profile.set_preference('gfx.downloadable_fonts.enabled', False)
+            profile.set_preference('browser.display.use_document_fonts', 0)
+        if self.block_css:
+            profile.set_preference('permissions.default.stylesheet', 2)
+        if self.block_domains:
+            profile.set_preference('network.proxy.type', 2)
+            profile.set_preference('network.proxy.autoconfig_url',
+                                   'data:text/javascript,' + quote(self.pac_script()))
+        if self.cache_dir:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            profile.set_preference('browser.cache.disk.enable', True)
+            profile.set_preference('browser.cache.disk.parent_directory', self.cache_dir)
+            profile.set_preference('browser.cache.disk.capacity', self.cache_mb * 1024)
+            profile.set_preference('browser.cache.disk.smart_size.enabled', False)
+        # Nothing the automation wants to hear about:
+        profile.set_preference('media.autoplay.default', 5)
+        profile.set_preference('dom.webnotifications.enabled', False)
+        profile.set_preference('browser.shell.checkDefaultBrowser', False)
+        profile.set_preference('app.update.enabled', False)
+        profile.update_preferences()
+        return profile
+
+    def capabilities(self):
+        caps = DesiredCapabilities.FIREFOX.copy()
+        if self.lean and self.page_load_strategy:
+            caps['pageLoadStrategy'] = self.page_load_strategy
+        return caps
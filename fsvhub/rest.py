@@ -0,0 +1,793 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import collections
+import contextlib
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .caches import EventGroupCache, UserCache, UserGroupCache
+from .events import EventStore
+from .jsondecode import decoder
+from .pagecache import PageCache
+from .paging import PageSizer
+from .throttle import ConcurrencyController
+
+
+class VhRest(object):
+    """
+    frontend to Volunteer Hub's published REST API. For info, see:
+    http://support.volunteerhub.com/Knowledgebase/List/Index/4/application-programmer-interface-api
+
+    There is one instance per tenant -- that is, per (API base URL, username)
+    pair, as returned by VhConfig.tenant_key(). Constructing a VhRest with
+    a config for a tenant that already has an instance returns that instance,
+    so each tenant has its own caches and HTTP session, and several tenants
+    can be served from one process.
+
+    Code which keeps an instance for a while -- a VhBrowser, or a job in
+    the daemon -- leases it, so it isn't dropped while in use:
+
+        with VhRest.leased(cfg) as vr:
+            ...
+
+    or vr = VhRest.acquire(cfg) ... vr.release(). At most max_tenants
+    instances are kept: when there are more, the least recently used ones
+    nobody holds a lease on are closed and dropped (if every one is
+    leased, there are more for a while). An instance dropped while still
+    in use carries on working, but isn't shared any more.
+
+    The events kept for event_store() are capped at MAX_CACHED_EVENTS
+    ([API] in the config) per tenant; see event_store().
+
+    An instance may be shared by several threads. Each collection (users,
+    user_groups, event_groups, and the events) has its own lock, held
+    while it is loaded or changed: if several threads need a collection
+    that isn't loaded, one fetches it and the others wait for that fetch,
+    rather than starting their own. A collection is loaded into a new
+    UserCache / UserGroupCache / EventGroupCache (see caches.py), which
+    replaces the old one only when it's complete, so readers see either
+    the old copy or the new one, never a half-filled one. Changes, such
+    as add_temp_user_group() and sync_users(), are made the same way, to
+    a copy which is then put in place (see _change()); holding the lock
+    meanwhile means they can't be lost to a reload running at the same
+    time.
+    """
+    max_tenants = 16
+    # Names of the lazily loaded collection properties:
+    collection_names = ('users', 'user_groups', 'event_groups')
+    _registry = collections.OrderedDict()
+    # (Reentrant, so acquire() can construct an instance while holding it.)
+    _registry_lock = threading.RLock()
+
+    def __new__(cls,cfg):
+        key = cfg.tenant_key()
+        with VhRest._registry_lock:
+            instance = VhRest._registry.get(key)
+            if instance is None:
+                instance = object.__new__(cls)
+                instance.cfg = cfg
+                instance.base_url = cfg.api['BASE_URL']
+                instance.session = requests.Session()
+                instance.session.auth = (cfg.username, cfg.password)
+                instance.controller = ConcurrencyController(
+                        maximum=cfg.api.getint('MAX_IN_FLIGHT', fallback=8),
+                        latency_target=cfg.api.getfloat('LATENCY_TARGET', fallback=5.0),
+                        backoff_base=cfg.api.getfloat('RETRY_BACKOFF', fallback=1.0),
+                        backoff_max=cfg.api.getfloat('RETRY_BACKOFF_MAX', fallback=30.0),
+                        latency_ratio=cfg.api.getfloat('LATENCY_RATIO', fallback=3.0),
+                        error_window=cfg.api.getint('ERROR_WINDOW', fallback=20),
+                        max_error_rate=cfg.api.getfloat('MAX_ERROR_RATE', fallback=0.1))
+                instance.decode = decoder(cfg.api.get('JSON_DECODER', fallback='auto'))
+                instance._decode_stats = { 'pages': 0, 'bytes': 0, 'seconds': 0.0 }
+                instance._decode_lock = threading.Lock()
+                instance.page_sizer = PageSizer.from_config(cfg)
+                # Snapshots of pages read in the browser, shared by all of
+                # this tenant's VhBrowsers (see VhBrowser.read_page()):
+                instance.page_cache = PageCache.from_config(cfg)
+                instance._caches = dict((name, None) for name in VhRest.collection_names)
+                instance._locks = dict((name, threading.RLock()) for name in VhRest.collection_names + ('events',))
+                # Bumped by each load, so a thread which waited for someone
+                # else's reload can tell, and use it instead of reloading:
+                instance._generations = dict((name, 0) for name in VhRest.collection_names)
+                instance.max_cached_events = cfg.api.getint('MAX_CACHED_EVENTS', fallback=50000)
+                # Number of acquire()s not yet release()d:
+                instance._leases = 0
+                instance.clear_caches()
+                VhRest._registry[key] = instance
+                VhRest._evict(keep=instance)
+            else:
+                # Same account, but pick up any change in the config
+                # (for example, a new password):
+                VhRest._registry.move_to_end(key)
+                instance.cfg = cfg
+                instance.session.auth = (cfg.username, cfg.password)
+            return instance
+
+    @classmethod
+    def tenants(cls):
+        """
+        Returns the keys of all tenants which currently have an instance,
+        least recently used first.
+        """
+        with VhRest._registry_lock:
+            return list(VhRest._registry.keys())
+
+    @classmethod
+    def forget(cls,cfg):
+        """
+        Closes and unregisters the instance for cfg's tenant, if any,
+        leased or not.
+        """
+        with VhRest._registry_lock:
+            instance = VhRest._registry.pop(cfg.tenant_key(), None)
+        if instance is not None:
+            instance.close()
+
+    @classmethod
+    def acquire(cls,cfg):
+        """
+        Returns the instance for cfg's tenant, leased: it won't be
+        dropped to make room for other tenants until release() is
+        called (as many times as acquire()).
+        """
+        with VhRest._registry_lock:
+            instance = cls(cfg)
+            instance._leases += 1
+            return instance
+
+    def release(self):
+        """
+        Gives back a lease taken by acquire().
+        """
+        with VhRest._registry_lock:
+            if self._leases <= 0:
+                raise Exception("VhRest released more times than acquired")
+            self._leases -= 1
+            VhRest._evict()
+
+    @classmethod
+    @contextlib.contextmanager
+    def leased(cls,cfg):
+        """
+        Context manager holding a lease on cfg's tenant's instance;
+        see acquire().
+        """
+        instance = cls.acquire(cfg)
+        try:
+            yield instance
+        finally:
+            instance.release()
+
+    @staticmethod
+    def _evict(keep=None):
+        """
+        With the registry lock held: closes and drops the least recently
+        used instances without leases (other than keep) until there are
+        at most max_tenants, or no more can go.
+        """
+        idle = [ k for k, v in VhRest._registry.items() if v is not keep and not v._leases ]
+        for old_key in idle[:max(0, len(VhRest._registry) - VhRest.max_tenants)]:
+            VhRest._registry.pop(old_key).close()
+
+    def clear_caches(self):
+        """
+        Drops all cached collections, and the page snapshots. They will
+        be reloaded from VolunteerHub the next time they are used.
+        """
+        self.page_cache.invalidate()
+        with self._locks['events']:
+            self._event_store = None
+        for name in VhRest.collection_names:
+            with self._locks[name]:
+                self._caches[name] = None
+
+    def refresh(self):
+        """
+        Brings the loaded collections up to date, for a long-running
+        process: the users by sync_users(), the groups by reloading them,
+        and the events by dropping them (they're fetched again when next
+        used). Collections which aren't loaded are left alone.
+        """
+        for name in VhRest.collection_names:
+            if self._caches[name] is None:
+                continue
+            if name == 'users':
+                self.sync_users()
+            else:
+                self._reload(name)
+        with self._locks['events']:
+            self._event_store = None
+
+    def close(self):
+        """
+        Frees this tenant's caches and closes its HTTP session.
+        """
+        self.clear_caches()
+        self.session.close()
+
+    def preload(self, collections=None):
+        """
+        Loads the named collections (default: all of them) now,
+        each on its own thread, instead of waiting for first use.
+        Returns the names loaded.
+        """
+        collections = tuple(collections or VhRest.collection_names)
+        with ThreadPoolExecutor(max_workers=len(collections)) as executor:
+            futures = [ executor.submit(getattr, self, name) for name in collections ]
+            for f in futures:
+                f.result()
+        return collections
+
+    def _cached(self, name):
+        """
+        The loaded copy of collection name, loading it first if need be.
+        """
+        cache = self._caches[name]
+        if cache is None:
+            cache = self._reload(name)
+        return cache
+
+    def _reload(self, name):
+        """
+        Loads collection name and puts it in place. If another thread
+        finished loading it while this one waited for the lock, that
+        copy is used instead of fetching it again.
+        """
+        generation = self._generations[name]
+        with self._locks[name]:
+            if self._generations[name] != generation and self._caches[name] is not None:
+                return self._caches[name]
+            if name == 'users':
+                cache = UserCache(datetime.datetime.now().replace(microsecond=0).isoformat())
+                self.get_vh_list(api_call='v2/users',
+                    data={ 'query': 'LastUpdate', 'earliestLastUpdate': '1970-01-01T00:00:00' },
+                    func=cache.add_from_json)
+            elif name == 'user_groups':
+                cache = UserGroupCache()
+                self.get_vh_list(api_call='v1/userGroups', data={}, func=cache.add_from_json)
+            else:
+                cache = EventGroupCache()
+                self.get_vh_list(api_call='v1/eventGroups', data={}, func=cache.add_from_json)
+            self._caches[name] = cache
+            self._generations[name] += 1
+            return cache
+
+    def _change(self, name, change):
+        """
+        Calls change(cache) on a copy of collection name (loading it
+        first if need be), and puts the copy in place of the loaded one.
+        Readers never see a change half made, and if change raises, the
+        loaded copy is left as it was.
+        """
+        with self._locks[name]:
+            cache = self._cached(name).copy()
+            change(cache)
+            self._caches[name] = cache
+            return cache
+
+    @property
+    def users(self):
+        return self._cached('users').users
+
+    @property
+    def event_groups(self):
+        return self._cached('event_groups').groups
+
+    @property
+    def user_groups(self):
+        return self._cached('user_groups').groups
+
+    @property
+    def event_group_tree(self):
+        """
+        GroupTree over the event groups; see event_group_path() etc.
+        """
+        return self._cached('event_groups').tree
+
+    @property
+    def user_group_tree(self):
+        """
+        GroupTree over the user groups; see user_group_path() etc.
+        """
+        return self._cached('user_groups').tree
+
+    def add_event_group_from_json(self,j):
+        self._change('event_groups', lambda c: c.add_from_json(j))
+
+    def get_event_group_list(self):
+        self._reload('event_groups')
+
+    def get_event_list(self, starting=None, stopping=None):
+        """
+        We cannot handle this as the way the users, user_groups,
+        and event_groups properties are handled, because we
+        have to be able to specify starting and stopping dates.
+        If starting is None, default to today at 12:00:00 am.
+        If stopping is None, default to getting all events from
+        starting on, with no end date.
+        starting and stopping, if supplied, must be in ISO8601
+        format, that is YYYY-MM-DDTHH:MM:SS, for example
+        "2016-03-31T00:00:00"
+        """
+        ret_list = []
+        if starting is None:
+            d = datetime.datetime.now().date()
+            starting = d.isoformat() + "T00:00:00"
+        # Define callback function to pass to get_vh_list:
+        def add_event_from_json(j):
+            ret_list.append(j)
+        data={ 'query': 'Time', 'earliestTime': starting }
+        if stopping is not None:
+            data['latestTime'] = stopping
+        print(data)
+        self.get_vh_list(api_call='v1/events', data=data,func=add_event_from_json)
+        return ret_list
+
+    def event_store(self, starting=None, stopping=None):
+        """
+        Returns an EventStore holding the events from starting to stopping
+        (datetimes; starting defaults to today at 12:00:00 am, stopping to
+        no end date). The store is kept, and reused for any later call whose
+        window it covers, so repeated queries cost no network calls.
+
+        Memory is capped by max_cached_events (0 for no limit): a store
+        holding more is returned but not kept, and once the kept store
+        is that big, a call it doesn't cover fetches just its own window
+        instead of widening the kept one.
+        """
+        if starting is None:
+            starting = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        store = self._event_store
+        if store is not None and store.covers(starting, stopping):
+            return store
+        with self._locks['events']:
+            # (Another thread may have loaded what's needed meanwhile.)
+            store = self._event_store
+            if store is not None and store.covers(starting, stopping):
+                return store
+            cap = self.max_cached_events
+            if store is not None and (not cap or len(store) < cap):
+                # Load a window covering both, so earlier queries still work:
+                starting = min(starting, store.earliest)
+                if stopping is not None and store.latest is not None:
+                    stopping = max(stopping, store.latest)
+                else:
+                    stopping = None
+            store = EventStore(starting, stopping)
+            data = { 'query': 'Time', 'earliestTime': starting.isoformat(timespec='seconds') }
+            if stopping is not None:
+                data['latestTime'] = stopping.isoformat(timespec='seconds')
+            self.get_vh_list(api_call='v1/events', data=data, func=store.add_from_json)
+            # Index it now, under the lock, so readers never change it:
+            store.index()
+            if not cap or len(store) <= cap:
+                self._event_store = store
+            return store
+
+    def events_between(self, start=None, end=None, event_group=None, include_subgroups=True):
+        """
+        Events starting between start and end (datetimes), in start time
+        order, optionally only those in the named event group (and, unless
+        include_subgroups is False, the groups under it; none, if there's
+        no event group by that name). For example:
+            now = datetime.datetime.now()
+            vr.events_between(now, now + datetime.timedelta(days=30), 'Distribution Center')
+        """
+        store = self.event_store(start, end)
+        group_ids = None
+        if event_group is not None:
+            c = self._cached('event_groups')
+            gid = c.ids.get(event_group)
+            if gid is None:
+                # (Not [ None ], which would match events with no group.)
+                return []
+            group_ids = [ gid ]
+            if include_subgroups:
+                group_ids += c.tree.descendants(gid)
+        return store.between(start, end, group_ids)
+
+    def expiration_report(self, starting=None, stopping=None):
+        """
+        Generator yielding one dict per (event, user group registration)
+        with the registration's reservation expiration setting, taken
+        from the events API payload -- no browser needed:
+            { 'event_id', 'event_name', 'start', 'user_group', 'expiration' }
+        The payload field names are in the [EVENT] section of the config
+        (API_ID_FIELD, API_REGISTRATIONS_FIELD, API_REG_GROUP_FIELD,
+        API_EXPIRATION_FIELD).
+
+        If an event's payload has no registration data, or a registration
+        has no expiration, a row is still yielded, with expiration None,
+        so the caller can fall back to reading the event's page (see
+        page_expiration_rows()).
+        """
+        for event in self.event_store(starting, stopping).between(starting, stopping):
+            for row in self.expiration_rows(event):
+                yield row
+
+    def expiration_rows(self, event):
+        """
+        expiration_report()'s rows for one Event.
+        """
+        ev = self.cfg.event
+        regs_field = ev.get('API_REGISTRATIONS_FIELD', 'UserGroupRegistrations')
+        group_field = ev.get('API_REG_GROUP_FIELD', 'UserGroupUid')
+        exp_field = ev.get('API_EXPIRATION_FIELD', 'ReservationExpiration')
+        row = { 'event_id': event.raw.get(ev['API_ID_FIELD']), 'event_name': event.name,
+                'start': event.start.isoformat() }
+        registrations = event.raw.get(regs_field)
+        if not registrations:
+            return [ dict(row, user_group=None, expiration=None) ]
+        return [ dict(row, user_group=self.user_group_name_from_id(reg.get(group_field)),
+                      expiration=reg.get(exp_field))
+                 for reg in registrations ]
+
+    @staticmethod
+    def page_expiration_rows(event_id, api_rows, expirations):
+        """
+        Rows for the expirations (select id -> text) read from an event's
+        page, in the same form as its api_rows (from expiration_rows()),
+        with 'source': 'page'. The page lists the user group registrations
+        in the API's order, so when the numbers agree, the i-th drop-down
+        is the i-th API row's group; otherwise the drop-down's id has to do.
+        """
+        same_groups = len(api_rows) == len(expirations) and None not in [ r['user_group'] for r in api_rows ]
+        rows = []
+        for i, (sel_id, text) in enumerate(expirations.items()):
+            rows.append({ 'event_id': event_id, 'event_name': api_rows[0]['event_name'],
+                          'start': api_rows[0]['start'],
+                          'user_group': api_rows[i]['user_group'] if same_groups else sel_id,
+                          'expiration': text, 'source': 'page' })
+        return rows
+
+    def event_group_name_from_id(self, gid):
+    #   if not gid or not gid in self.event_groups:
+        if not gid:
+            return None
+        else:
+            # if no such event group, set it to an empty dict
+            eg = self.event_groups.get(gid,{})
+            # if eg is empty, next line will return None
+            return eg.get('name',None)
+            #return self.event_groups[gid]['name']
+
+    def event_group_id_from_name(self,gname):
+        return self._cached('event_groups').ids.get(gname)
+
+    def event_group_parent_name(self,gname):
+        # One copy throughout, in case of a reload meanwhile:
+        c = self._cached('event_groups')
+        gid = c.ids.get(gname)
+        if gid is None:
+            return None
+        return c.groups.get(c.groups[gid]['parent_id'], {}).get('name')
+
+    def event_group_path(self,gname):
+        """
+        Names of the event groups from the top level down to gname (inclusive).
+        Empty if there's no such group.
+        """
+        c = self._cached('event_groups')
+        return [ c.groups[g]['name'] for g in c.tree.path(c.ids.get(gname)) ]
+
+    def event_group_descendants(self,gname):
+        """
+        Names of every event group below gname.
+        """
+        c = self._cached('event_groups')
+        return [ c.groups[g]['name'] for g in c.tree.descendants(c.ids.get(gname)) ]
+
+    def add_user_group_from_json(self,j):
+        self._change('user_groups', lambda c: c.add_from_json(j))
+
+    def get_user_group_list(self):
+        self._reload('user_groups')
+
+    def user_group_name_from_id(self, gid):
+        #if not gid or not gid in self.user_groups:
+        #    return None
+        #return self.user_groups[gid]['name']
+        if not gid:
+            return None
+        else:
+            # if no such user group, set it to an empty dict:
+            ug = self.user_groups.get(gid,{})
+            # if ug is empty, next line will return None:
+            return ug.get('name',None)
+
+
+    def user_group_id_from_name(self,gname):
+        return self._cached('user_groups').ids.get(gname)
+
+    def user_group_parent_name(self,gname):
+        # One copy throughout, in case of a reload meanwhile:
+        c = self._cached('user_groups')
+        gid = c.ids.get(gname)
+        if gid is None:
+            return None
+        return c.groups.get(c.groups[gid]['parent_id'], {}).get('name')
+
+    def user_group_path(self,gname):
+        """
+        Names of the user groups from the top level down to gname (inclusive),
+        for example [ 'All Users', 'Corporate Groups', 'Kroger', 'Kroger - Jones' ].
+        Empty if there's no such group.
+        """
+        c = self._cached('user_groups')
+        return [ c.groups[g]['name'] for g in c.tree.path(c.ids.get(gname)) ]
+
+    def user_group_descendants(self,gname):
+        """
+        Names of every user group below gname, for example all the teams
+        under 'Corporate Groups'.
+        """
+        c = self._cached('user_groups')
+        return [ c.groups[g]['name'] for g in c.tree.descendants(c.ids.get(gname)) ]
+
+    def user_group_is_under(self,gname,ancestor_name):
+        """
+        True if ancestor_name is the parent, grandparent, etc. of gname.
+        """
+        c = self._cached('user_groups')
+        gid = c.ids.get(gname)
+        ancestor_id = c.ids.get(ancestor_name)
+        if gid is None or ancestor_id is None:
+            return False
+        return c.tree.is_under(gid, ancestor_id)
+
+    def add_temp_user_group(self,user_group_name, parent_group_name, description):
+        """
+        If the UserGroupApi adds a group, we won't know the group id
+        yet -- that is assigned internally by Volunteer Hub's backend.
+        But we need to record the fact that this name is taken. We can
+        do that by re-running get_user_group_list(), but it may be cheaper
+        just to generate a unique id with the timestamp and use that
+        as this group's id.
+
+        This will fail silently in the unlikely event that two clients add the same
+        group name within the same millisecond!
+
+        The temp group added here will be stored in-RAM only, not in
+        the Volunteer Hub database. This in-RAM store will be overwritten
+        by the next call to get_user_group_list().
+
+        """
+        temp_id = 'TMP_UID_' + datetime.datetime.now().isoformat()
+        # (The parent is looked up in the copy, so a reload can't replace
+        # the groups in between.)
+        self._change('user_groups',
+                lambda c: c.add(temp_id, user_group_name, c.ids.get(parent_group_name), description))
+
+    def user_name_from_id(self, uid):
+        #if not uid or not uid in self.users:
+        #    return None
+        #else:
+        #    return self.users[uid]['username']
+        if not uid:
+            return None
+        else:
+            # if no such user, set it to an empty dict:
+            u = self.users.get(uid,{})
+            # if u is empty, next line will return None:
+            return u.get('username',None)
+
+    @property
+    def user_memberships(self):
+        """
+        MembershipIndex from user group id to member user ids.
+        """
+        return self._cached('users').memberships
+
+    def user_group_members(self,gname):
+        """
+        Ids of the users in user group gname.
+        """
+        return self.user_memberships.members(self.user_group_id_from_name(gname))
+
+    def user_group_member_count(self,gname):
+        return self.user_memberships.count(self.user_group_id_from_name(gname))
+
+    def users_in_all_groups(self,*gnames):
+        """
+        Ids of the users who belong to every one of the named groups,
+        for example users_in_all_groups('Team Leaders', 'Kroger - Jones').
+        """
+        return self.user_memberships.intersection(*[ self.user_group_id_from_name(g) for g in gnames ])
+
+    def user_in_group(self,username,gname):
+        return self.user_memberships.is_member(self.user_id_from_username(username),
+                                               self.user_group_id_from_name(gname))
+
+    def users_loaded(self):
+        """
+        True if the user list has been downloaded, so user lookups
+        won't cause a download.
+        """
+        return self._caches['users'] is not None
+
+    def user_id_from_username(self,username):
+        return self._cached('users').ids.get(username)
+
+    def add_temp_user(self,username,group_names=()):
+        """
+        Like add_temp_user_group(), records in RAM that a user has just
+        been added, under a temporary id, which is returned. Records
+        nothing if the user list hasn't been loaded -- it would be
+        replaced on loading anyway.
+        """
+        uid = 'TMP_UID_' + datetime.datetime.now().isoformat()
+        if self._caches['users'] is None:
+            return uid
+        # (Look the groups up first, so only one lock is held at a time.)
+        group_ids = [ g for g in [ self.user_group_id_from_name(n) for n in group_names ] if g ]
+        with self._locks['users']:
+            if self._caches['users'] is not None:
+                self._change('users', lambda c: c.add(uid, { 'username': username, 'group_ids': group_ids }))
+        return uid
+
+    def add_user_from_json(self,u):
+        self._change('users', lambda c: c.add_from_json(u))
+
+    def get_user_list(self):
+        self._reload('users')
+
+    def sync_users(self):
+        """
+        Brings the user cache (and its membership index) up to date by
+        fetching only the users changed since the last load or sync.
+        Does a full load if the users haven't been loaded yet.
+
+        Users deleted in Volunteer Hub are not noticed; use
+        get_user_list() to start over.
+        """
+        with self._locks['users']:
+            if self._caches['users'] is None:
+                self._reload('users')
+                return
+            # Taken before fetching, so changes made meanwhile are picked
+            # up next time; but only kept if the fetch works (otherwise
+            # the copy is thrown away), so a failed sync's changes are
+            # fetched again too:
+            now = datetime.datetime.now().replace(microsecond=0).isoformat()
+            def fetch(c):
+                self.get_vh_list(api_call='v2/users',
+                    data={ 'query': 'LastUpdate', 'earliestLastUpdate': c.synced_at },
+                    func=c.add_from_json)
+                c.synced_at = now
+            self._change('users', fetch)
+
+    def metrics(self):
+        """
+        Request statistics for this tenant, including the current
+        concurrency window and its history; see ConcurrencyController.
+        """
+        with self._decode_lock:
+            decoding = dict(self._decode_stats)
+        return { 'http': self.controller.metrics(), 'decode': decoding }
+
+    def http_get(self, api_call, params=None):
+        """
+        GET from the VolunteerHub API, through this tenant's
+        ConcurrencyController. 429 and 5xx responses are retried (after
+        any Retry-After delay, or else with exponential backoff; see
+        ConcurrencyController.retry_delay()) up to [API] MAX_RETRIES
+        times; the last response is returned either way.
+        """
+        retries = self.cfg.api.getint('MAX_RETRIES', fallback=5)
+        attempt = 0
+        while True:
+            started = self.controller.acquire()
+            try:
+                r = self.session.get(self.base_url + api_call, params=params)
+            except requests.RequestException:
+                self.controller.release(started)
+                raise
+            self.controller.release(started, r.status_code, r.headers.get('Retry-After'))
+            if (r.status_code == 429 or r.status_code >= 500) and attempt < retries:
+                attempt += 1
+                time.sleep(self.controller.retry_delay(attempt, r.headers.get('Retry-After')))
+                continue
+            return r
+
+    def decode_page(self, content):
+        """
+        Decodes one page of JSON from the API with self.decode ([API]
+        JSON_DECODER: orjson, if it's installed, unless told otherwise),
+        keeping count of pages, bytes and time taken for metrics().
+        """
+        started = time.perf_counter()
+        j = self.decode(content)
+        elapsed = time.perf_counter() - started
+        with self._decode_lock:
+            self._decode_stats['pages'] += 1
+            self._decode_stats['bytes'] += len(content)
+            self._decode_stats['seconds'] += elapsed
+        return j
+
+    def get_vh_list(self, api_call='', data=None, func=None, offset=0, page_size=None, page_done=None):
+        """
+        Performs repeated (scrolling) call to VH Rest API
+        to retrieve desired data.
+        Pass:
+            api_call (string) -- which api call to make
+            data (dict) -- any parameters, other than page number and number
+                of records per page, required by the api call
+            func (function or method) -- handler for the results of each
+                call to VH
+            offset (int), page_size (int) -- to start part way through,
+                at record offset, with pages of page_size records (the
+                offset must be a multiple of it)
+            page_done (function) -- if given, called as
+                page_done(offset, page_size) once each page's records
+                have been handled, with the number of records read so far
+                and the size of that page; passing those back as offset
+                and page_size carries on after it
+
+        Example use:
+            data_dict = { 'query': 'LastUpdate', 'earliestLastUpdate': '1970-01-01T00:00:00' }
+            self.get_vh_list(api_call='v2/users', data=data_dict, func=self.add_user_from_json)
+
+        """
+        # Work on a copy, so the caller's dict isn't modified:
+        data = dict(data) if data else {}
+        # How many should we get in each chunk? (See PageSizer.)
+        records_per_page = page_size or self.page_sizer.start(api_call)
+        if offset % records_per_page:
+            raise ValueError("offset {} is not a multiple of page size {}".format(offset, records_per_page))
+        if page_size:
+            # (A size handed back from page_done(), so it was served in full.)
+            self.page_sizer.served(api_call, page_size)
+        # (offset, length) of a short page which may have been capped by
+        # the server (see PageSizer); if records turn up past its end, it was:
+        short_page = None
+        # The biggest size which came back full, for PageSizer.finish():
+        biggest_full = None
+        while True:
+            # Add page parameters to passed-in data dict...
+            data['pageSize'] = records_per_page
+            data['page'] = offset // records_per_page
+            # Construct and submit http request to VH server to get
+            # "pageSize" records...
+            started = time.perf_counter()
+            r = self.http_get(api_call, params=data)
+            elapsed = time.perf_counter() - started
+            if r.status_code != 200:
+                raise Exception('Failure calling VolunteerHub API')
+            # Process each item in returned JSON...
+            # Does it even make sense to have func==None?
+            j = self.decode_page(r.content)
+            served = self.page_sizer.served(api_call)
+            if j and len(j) < records_per_page and records_per_page > served and offset % served == 0:
+                # Either the last page, or the server serves fewer than
+                # this many at a time. Ask for the rest again, at the
+                # biggest size it's known to serve in full:
+                short_page = (offset, len(j))
+                records_per_page = served
+                continue
+            if short_page is not None and offset + len(j) > sum(short_page):
+                print("{} serves at most {} records per page".format(api_call, short_page[1]))
+                self.page_sizer.limit(api_call, short_page[1])
+                short_page = None
+            if len(j) == records_per_page:
+                self.page_sizer.served(api_call, records_per_page)
+                biggest_full = max(biggest_full or 0, records_per_page)
+            if func != None:
+                for rec in j:
+                    func(rec)
+            if page_done != None:
+                page_done(offset + len(j), records_per_page)
+            # Are we done? (A short page here is at a size which has been
+            # served in full, so it isn't a cap -- unless the size came
+            # from a resumed pull and the served ones don't line up with it.)
+            if len(j) < records_per_page:
+                break
+            else:
+                # Not done - go to next chunk, maybe of a different size
+                offset += records_per_page
+                records_per_page = self.page_sizer.next_size(api_call, records_per_page,
+                        offset, elapsed, len(r.content))
+        self.page_sizer.finish(api_call, biggest_full)
@@ -0,0 +1,63 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import hashlib
+import json
+import os
+import os.path
+
+from .util import Util
+
+
+class LocalState(object):
+    """
+    Small JSON file used to remember things between runs, for example
+    which events have already been swept. There is one file per tenant
+    and purpose, in the directory given by [STATE] DIR in the config:
+
+        state = LocalState.for_tenant(cfg, 'overflow_sweep')
+        if state.get(event_id) != fp: ...
+        state.set(event_id, fp)
+        state.save()
+
+    save() writes to a temporary file and renames it, so an interrupted
+    run can't leave a half-written file behind.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._data = {}
+        if os.path.exists(path):
+            with open(path, 'r') as infile:
+                self._data = json.load(infile)
+
+    @staticmethod
+    def for_tenant(cfg, name):
+        base_url, username = cfg.tenant_key()
+        fname = '{}_{}_{}.json'.format(Util.minify(base_url), Util.minify(username), name)
+        return LocalState(os.path.join(cfg.state['DIR'], fname))
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def set(self, key, value):
+        self._data[key] = value
+
+    def remove(self, key):
+        self._data.pop(key, None)
+
+    def save(self):
+        d = os.path.dirname(self.path)
+        if d and not os.path.isdir(d):
+            os.makedirs(d)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as outfile:
+            json.dump(self._data, outfile, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def fingerprint(obj):
+        """
+        Stable hash of a JSON-serializable object, for noticing
+        whether something has changed since it was last seen.
+        """
+        s = json.dumps(obj, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha1(s.encode('utf-8')).hexdigest()
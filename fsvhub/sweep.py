@@ -0,0 +1,274 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import re
+import sys
+
+from selenium.webdriver.support.ui import Select
+
+from .state import LocalState
+from .util import Util
+
+
+class SweepOperation(object):
+    """
+    One thing to do on each event's Registered Users page, as part of an
+    EventSweep. Subclasses override the steps they need. Each step gets
+    the VhBrowser, already on the event's page, and the Event (see
+    events.py).
+    """
+    name = 'operation'
+
+    def wants(self, event):
+        """
+        False to leave this event alone. If no operation wants an
+        event, its page isn't loaded at all.
+        """
+        return True
+
+    def read(self, b, event):
+        """
+        Called before anything on the page has been changed. Whatever it
+        returns is passed to done().
+        """
+        return None
+
+    def change(self, b, event):
+        """
+        Makes this operation's changes to the form, without saving it.
+        Returns how many controls were changed.
+        """
+        return 0
+
+    def verify(self, b, event):
+        """
+        Called on the reloaded page, if the page was saved. Returns a
+        list of problems (strings); empty if the changes took.
+        """
+        return []
+
+    def done(self, event, ok, result):
+        """
+        Called once the event is finished with. ok is False if the page
+        didn't load, or the save didn't take; result is what read()
+        returned.
+        """
+        pass
+
+    def finish(self):
+        """
+        Called at the end of the sweep.
+        """
+        pass
+
+
+class EventSweep(object):
+    """
+    Visits each event's Registered Users page once, and does everything
+    a list of SweepOperations wants done there: all of them read the
+    page, all of them make their changes, and the page is saved once
+    (if anything was changed) and then checked by all of them. So
+    clearing the AllowOverflow checkboxes, setting lead times and
+    reading the expirations costs one crawl, not one each.
+
+        sweep = EventSweep(b, [ ClearOverflow(state), ReadExpirations(b.vr, writer.write) ])
+        sweep.run(b.vr.events_between(start, end))
+
+    A visit is repeated, in a new browser, if the browser fails during
+    it (see VhBrowser.recovering()); operations shouldn't do anything
+    they can't repeat before done().
+    """
+    def __init__(self, vh_browser, operations):
+        self.vh_browser = vh_browser
+        self.operations = list(operations)
+        self.reg_users_url = vh_browser.cfg.event['REG_USERS_URL']
+        self.save_id = vh_browser.cfg.event['BTN_SAVE_REGISTRATION']
+        self.id_field = vh_browser.cfg.event['API_ID_FIELD']
+
+    def event_id(self, event):
+        return str(event.raw[self.id_field])
+
+    def run(self, events):
+        """
+        Sweeps events; returns counts of what happened to them.
+        """
+        counts = { 'visited': 0, 'saved': 0, 'skipped': 0, 'failed': 0 }
+        try:
+            for event in events:
+                ops = [ op for op in self.operations if op.wants(event) ]
+                if not ops:
+                    counts['skipped'] += 1
+                    continue
+                print("Processing {} ({}, {})".format(self.event_id(event), event.name, event.start))
+                ok, saved, results = self.vh_browser.recovering(self.visit, event, ops)
+                counts['visited'] += 1
+                if saved:
+                    counts['saved'] += 1
+                if not ok:
+                    counts['failed'] += 1
+                for op, result in zip(ops, results):
+                    op.done(event, ok, result)
+        finally:
+            for op in self.operations:
+                op.finish()
+        return counts
+
+    def visit(self, event, ops):
+        """
+        Does ops on event's page. Returns (ok, saved, [ result of each
+        op's read() ]).
+        """
+        b = self.vh_browser
+        url = self.reg_users_url + self.event_id(event)
+        b.goto(url)
+        save_button = b.wait_for_element(self.save_id)
+        if save_button is None:
+            print("Page did not load: {}".format(url))
+            return False, False, [ None ] * len(ops)
+        results = [ op.read(b, event) for op in ops ]
+        changed = sum([ op.change(b, event) for op in ops ])
+        if not changed:
+            return True, False, results
+        save_button.click()
+        # Any snapshot of this page is out of date now:
+        b.invalidate_pages(re.escape(url) + '$')
+        b.wait_for_element_to_disappear(save_button)
+        if b.wait_for_element(self.save_id) is None:
+            print("Page did not reload after saving: {}".format(url))
+            return False, True, results
+        problems = [ p for op in ops for p in op.verify(b, event) ]
+        for p in problems:
+            print(p)
+        return not problems, True, results
+
+
+class ClearOverflow(SweepOperation):
+    """
+    Clears the AllowOverflow checkboxes. If state (a LocalState) is
+    given, events whose user group registrations haven't changed since
+    they were last cleared are skipped. Only each registration's group
+    and its [EVENT] API_OVERFLOW_FIELDS count, so other changes to the
+    event don't bring it back.
+    """
+    name = 'clear_overflow'
+
+    def __init__(self, cfg, state=None):
+        ev = cfg.event
+        self.patt = ev['CHK_ALLOW_OVERFLOW_REGEX']
+        self.id_field = ev['API_ID_FIELD']
+        self.regs_field = ev.get('API_REGISTRATIONS_FIELD', 'UserGroupRegistrations')
+        self.group_field = ev.get('API_REG_GROUP_FIELD', 'UserGroupUid')
+        self.overflow_fields = [ f.strip() for f in ev.get('API_OVERFLOW_FIELDS', 'AllowOverflow').split(',') ]
+        self.state = state
+        self.checked = []
+
+    def fingerprint(self, event, cleared=False):
+        """
+        Fingerprint of event's registrations, as far as this operation
+        cares; if cleared is True, as they are once their overflow has
+        been cleared.
+        """
+        regs = []
+        for reg in event.raw.get(self.regs_field) or []:
+            fields = dict((f, reg.get(f)) for f in self.overflow_fields)
+            if cleared:
+                fields = dict((f, None if v is None else False) for f, v in fields.items())
+            regs.append([ reg.get(self.group_field), fields ])
+        return LocalState.fingerprint(regs)
+
+    def wants(self, event):
+        if self.state is None:
+            return True
+        if self.state.get(str(event.raw[self.id_field])) == self.fingerprint(event):
+            print("Skipping {} -- unchanged since last sweep".format(event.raw[self.id_field]))
+            return False
+        return True
+
+    def read(self, b, event):
+        # Read every matching checkbox in one pass:
+        self.checked = [ cb_id for cb_id, on in b.checkbox_states(self.patt).items() if on ]
+        return self.checked
+
+    def change(self, b, event):
+        if not self.checked:
+            print("No AllowOverflow checkboxes to clear")
+            return 0
+        for cb_id in self.checked:
+            Util.turn_off(b.browser.find_element_by_id(cb_id))
+        return len(self.checked)
+
+    def verify(self, b, event):
+        still_checked = [ cb_id for cb_id, on in b.checkbox_states(self.patt).items() if on ]
+        if still_checked:
+            return [ "Save did not clear {} checkbox(es): {}".format(len(still_checked), ', '.join(still_checked)) ]
+        print("Cleared {} checkbox(es)".format(len(self.checked)))
+        return []
+
+    def done(self, event, ok, result):
+        if ok and self.state is not None:
+            # What the API will show from now on -- after the save, if
+            # there was anything to clear:
+            self.state.set(str(event.raw[self.id_field]), self.fingerprint(event, cleared=bool(result)))
+            # Save as we go, so an interrupted run doesn't repeat work:
+            self.state.save()
+
+
+class SetLeadTimes(SweepOperation):
+    """
+    Sets every reservation expiration (lead time) drop-down to the
+    option with text lead_time.
+    """
+    name = 'set_lead_time'
+
+    def __init__(self, cfg, lead_time):
+        self.patt = '^(?:' + cfg.event['SEL_EXPIRATION_REGEX'] + ')'
+        self.lead_time = lead_time
+        self.wrong = []
+
+    def read(self, b, event):
+        self.wrong = [ sel_id for sel_id, text in b.selected_options(self.patt).items()
+                       if text != self.lead_time ]
+
+    def change(self, b, event):
+        for sel_id in self.wrong:
+            Select(b.browser.find_element_by_id(sel_id)).select_by_visible_text(self.lead_time)
+        return len(self.wrong)
+
+    def verify(self, b, event):
+        wrong = [ sel_id for sel_id, text in b.selected_options(self.patt).items()
+                  if text != self.lead_time ]
+        if wrong:
+            return [ "Save did not set lead time on {} drop-down(s): {}".format(len(wrong), ', '.join(wrong)) ]
+        print("Set {} lead time(s) to {}".format(len(self.wrong), self.lead_time))
+        return []
+
+
+class ReadExpirations(SweepOperation):
+    """
+    Reports each user group registration's reservation expiration, as
+    it was before any changes, by calling write_row() with a dict like
+    the rows of VhRest.expiration_report() (plus 'source': 'page'),
+    naming the groups as that does where it can (see
+    VhRest.page_expiration_rows()).
+    """
+    name = 'read_expirations'
+
+    def __init__(self, vr, write_row):
+        self.vr = vr
+        self.patt = '^(?:' + vr.cfg.event['SEL_EXPIRATION_REGEX'] + ')'
+        self.id_field = vr.cfg.event['API_ID_FIELD']
+        self.write_row = write_row
+
+    def read(self, b, event):
+        return b.selected_options(self.patt)
+
+    def done(self, event, ok, result):
+        eid = str(event.raw[self.id_field])
+        if result is None:
+            sys.stderr.write("{}: page did not load\n".format(eid))
+            return
+        for row in self.vr.page_expiration_rows(eid, self.vr.expiration_rows(event), result):
+            self.write_row(row)
+
+
+# Name -> operation class, for sweep_events.py:
+OPERATIONS = dict((op.name, op) for op in (ClearOverflow, SetLeadTimes, ReadExpirations))
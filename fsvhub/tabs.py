@@ -0,0 +1,173 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import time
+
+from .browser import BROWSER_ERRORS
+
+
+class TabPool(object):
+    """
+    Loads several pages at once in one browser session, using tabs.
+
+    Most of the time spent visiting a page is waiting for it to load.
+    TabPool keeps up to size tabs loading, and hands each page to
+    harvest() as soon as it is ready -- whichever tab that is -- then
+    starts the next URL in that tab. Read-only sweeps over many pages
+    run close to size times faster, without starting more Firefox
+    processes. Use it only for pages that are read, not changed:
+
+        pool = TabPool(vh_browser, size=4)
+        for url, result in pool.map(urls, 'SomeElementId', read_page):
+            ...
+        pool.close()
+
+    harvest is called with the VhBrowser, switched to the ready tab.
+    If a page isn't ready within timeout seconds, it is yielded with
+    a result of None. Results are kept in the browser's page cache
+    (see VhBrowser.read_page()), and URLs with a current snapshot are
+    yielded first, without loading them.
+
+    Each page started counts as a navigation of the VhBrowser (see
+    VhBrowser.recycle_reason()). If the browser dies, it is restarted,
+    the tabs are opened again and the pages which were loading are
+    started over, once; if it dies again before any page is read, the
+    error is raised.
+    """
+    # Set on the old document just before navigating, so a tab isn't
+    # taken as ready while it still shows the previous page:
+    STALE_MARKER = 'data-tabpool-stale'
+
+    def __init__(self, vh_browser, size=4, timeout=30, poll_interval=0.1):
+        self.vh_browser = vh_browser
+        self.size = size
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.handles = []
+
+    def _open_tabs(self):
+        vb = self.vh_browser
+        vb.ensure_logged_in()
+        vb.save_window_handle()
+        self.handles = [ vb.browser.current_window_handle ]
+        while len(self.handles) < self.size:
+            vb.browser.execute_script("window.open('about:blank');")
+            vb.switch_to_newest_window()
+            self.handles.append(vb.browser.current_window_handle)
+
+    def _start(self, handle, url):
+        vb = self.vh_browser
+        vb.browser.switch_to_window(handle)
+        vb.browser.execute_script(
+            "document.documentElement.setAttribute(arguments[1], '1');"
+            "window.location.href = arguments[0];", url, TabPool.STALE_MARKER)
+        vb.navigations += 1
+
+    def _is_ready(self, handle, ready_id):
+        vb = self.vh_browser
+        try:
+            vb.browser.switch_to_window(handle)
+            return vb.browser.execute_script(
+                "return !document.documentElement.hasAttribute(arguments[1])"
+                " && document.getElementById(arguments[0]) !== null;", ready_id, TabPool.STALE_MARKER)
+        except BROWSER_ERRORS as e:
+            # While the tab is between documents, the script can fail
+            # (JavascriptException and the like); that's just not ready
+            # yet -- unless the browser itself has gone.
+            if vb.browser_failed(e):
+                raise
+            return False
+
+    def _restart(self, e, busy):
+        """
+        Restarts the browser after e, opens the tabs again, and returns
+        busy for the new tabs, with the pages which were loading to be
+        started over.
+        """
+        vb = self.vh_browser
+        urls = [ url for url, started in busy.values() ]
+        vb.restart('{}: {}'.format(type(e).__name__, str(e).strip()))
+        self.handles = []
+        # The first page through goto(), which signs in again if the
+        # old session didn't carry over:
+        vb.goto(urls[0])
+        self._open_tabs()
+        busy = { self.handles[0]: (urls[0], time.time()) }
+        for handle, url in zip(self.handles[1:], urls[1:]):
+            busy[handle] = (url, None)
+        return busy
+
+    def map(self, urls, ready_id, harvest, kind=None):
+        """
+        Generator yielding (url, harvest result) for each url, in the
+        order the pages become ready. ready_id is the id of an element
+        which is present once a page has loaded. kind is the page cache
+        key, as for VhBrowser.read_page().
+        """
+        vb = self.vh_browser
+        cache = vb.page_cache
+        kind = kind or harvest.__name__
+        to_load = []
+        for url in urls:
+            result = cache.get(url, kind)
+            if result is not None:
+                yield url, result
+            else:
+                to_load.append(url)
+        if not to_load:
+            return
+        if not self.handles:
+            self._open_tabs()
+        pending = iter(to_load)
+        busy = {}   # handle -> (url, time started, or None if not started yet)
+        for handle in self.handles:
+            url = next(pending, None)
+            if url is None:
+                break
+            busy[handle] = (url, None)
+        # Set by a restart, until a page is read:
+        restarted = False
+        while busy:
+            try:
+                progress = False
+                for handle in list(busy.keys()):
+                    url, started = busy[handle]
+                    if started is None:
+                        self._start(handle, url)
+                        busy[handle] = (url, time.time())
+                        continue
+                    if self._is_ready(handle, ready_id):
+                        result = harvest(vb)
+                        cache.put(url, kind, result)
+                    elif time.time() - started > self.timeout:
+                        print("Timed out waiting for {}".format(url))
+                        result = None
+                    else:
+                        continue
+                    progress = True
+                    restarted = False
+                    del busy[handle]
+                    yield url, result
+                    next_url = next(pending, None)
+                    if next_url is not None:
+                        busy[handle] = (next_url, None)
+                if not progress:
+                    time.sleep(self.poll_interval)
+            except BROWSER_ERRORS as e:
+                if restarted or not vb.browser_failed(e):
+                    raise
+                busy = self._restart(e, busy)
+                restarted = True
+
+    def close(self):
+        """
+        Closes the extra tabs and goes back to the original window.
+        """
+        if not self.handles:
+            # (Never opened, or already closed.)
+            return
+        vb = self.vh_browser
+        for handle in self.handles[1:]:
+            vb.browser.switch_to_window(handle)
+            vb.browser.close()
+        self.handles = []
+        vb.return_to_previous_window()
@@ -0,0 +1,188 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import collections
+import email.utils
+import random
+import threading
+import time
+
+
+class ConcurrencyController(object):
+    """
+    Limits the number of requests in flight to one server, adjusting
+    the limit (the window) as it goes, the way TCP does (AIMD):
+
+      * each healthy response (fast enough, not an error) widens the
+        window by 1/window -- about one more slot per window's worth of
+        requests, so growth is additive -- unless more than
+        max_error_rate of the last error_window responses were errors;
+      * a 429 or 5xx response, a connection error, or a slow response
+        cuts the window by decrease_factor. Only one cut is made per
+        burst of bad responses: requests which started before the last
+        cut don't cut it again;
+      * a Retry-After header holds back all new requests until it expires.
+
+    A response is slow if it took longer than latency_target, or more
+    than latency_ratio times the usual latency: an exponentially
+    weighted moving average of the latencies of the responses which
+    weren't errors, each weighing baseline_weight. So the window backs
+    off as soon as a server starts to struggle, without a target tuned
+    to it.
+
+    retry_delay() says how long to wait before retrying a throttled or
+    failed request which came without a Retry-After: exponential backoff
+    from backoff_base seconds, up to backoff_max, with random jitter so
+    that retries from several threads don't arrive together.
+
+    Use acquire() before each request and release() after it. metrics()
+    and history show how the window has moved, for tuning per tenant.
+    """
+    def __init__(self, initial=2, minimum=1, maximum=8, latency_target=5.0,
+                 decrease_factor=0.5, history_size=500, backoff_base=1.0, backoff_max=30.0,
+                 latency_ratio=3.0, baseline_weight=0.1, error_window=20, max_error_rate=0.1):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.latency_ratio = latency_ratio
+        self.baseline_weight = baseline_weight
+        self.max_error_rate = max_error_rate
+        # The usual latency (see above); None until the first response:
+        self.baseline = None
+        # True for each of the last error_window responses which was an error:
+        self._recent = collections.deque(maxlen=error_window)
+        self.decrease_factor = decrease_factor
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.window = float(min(max(initial, minimum), maximum))
+        # (time, window, reason) for each change of whole window size:
+        self.history = collections.deque(maxlen=history_size)
+        self._in_flight = 0
+        self._resume_at = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._requests = 0
+        self._errors = 0
+        self._throttled = 0
+        self._slow = 0
+        self._latency_total = 0.0
+        self._retries = 0
+        self._backoff_total = 0.0
+
+    def acquire(self):
+        """
+        Blocks until a request may start. Returns the start time,
+        to be passed back to release().
+        """
+        with self._cond:
+            while True:
+                wait = self._resume_at - time.time()
+                if wait <= 0 and self._in_flight < int(self.window):
+                    break
+                self._cond.wait(wait if wait > 0 else None)
+            self._in_flight += 1
+            return time.time()
+
+    def release(self, started, status=None, retry_after=None):
+        """
+        Records the outcome of a request begun at started (from acquire()).
+        status is the HTTP status code, or None if the request failed
+        without a response. retry_after is the response's Retry-After
+        header, if any.
+        """
+        now = time.time()
+        latency = now - started
+        with self._cond:
+            self._in_flight -= 1
+            self._requests += 1
+            self._latency_total += latency
+            failed = status is None or status == 429 or status >= 500
+            self._recent.append(failed)
+            if failed:
+                reason = 'throttled' if status == 429 else 'error'
+                if status == 429:
+                    self._throttled += 1
+                else:
+                    self._errors += 1
+            else:
+                if latency > self.latency_target or \
+                        (self.baseline is not None and latency > self.baseline * self.latency_ratio):
+                    reason = 'slow'
+                    self._slow += 1
+                else:
+                    reason = None
+                # (After the check, so a slow response is measured against
+                # the latency before it.)
+                if self.baseline is None:
+                    self.baseline = latency
+                else:
+                    self.baseline += self.baseline_weight * (latency - self.baseline)
+            old = int(self.window)
+            if reason is None:
+                if self._error_rate() <= self.max_error_rate:
+                    self.window = min(self.maximum, self.window + 1.0 / self.window)
+            elif started >= self._last_decrease:
+                self.window = max(self.minimum, self.window * self.decrease_factor)
+                self._last_decrease = now
+            delay = ConcurrencyController.parse_retry_after(retry_after, now)
+            if delay:
+                self._resume_at = max(self._resume_at, now + delay)
+            if int(self.window) != old:
+                self.history.append((now, int(self.window), reason or 'healthy'))
+            self._cond.notify_all()
+
+    def _error_rate(self):
+        return sum(self._recent) / len(self._recent) if self._recent else 0.0
+
+    def retry_delay(self, attempt, retry_after=None):
+        """
+        Seconds to sleep before retry number attempt (1 for the first) of
+        a request, counting the retry in metrics(). 0 if the response had
+        a valid Retry-After, since acquire() already waits for that.
+        """
+        if ConcurrencyController.parse_retry_after(retry_after) is not None:
+            delay = 0.0
+        else:
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+            delay = delay / 2 + random.uniform(0, delay / 2)
+        with self._cond:
+            self._retries += 1
+            self._backoff_total += delay
+        return delay
+
+    def metrics(self):
+        with self._cond:
+            return {
+                'window': int(self.window),
+                'in_flight': self._in_flight,
+                'requests': self._requests,
+                'errors': self._errors,
+                'throttled': self._throttled,
+                'slow': self._slow,
+                'retries': self._retries,
+                'backoff_seconds': self._backoff_total,
+                'mean_latency': self._latency_total / self._requests if self._requests else None,
+                'latency_baseline': self.baseline,
+                'error_rate': self._error_rate(),
+                'paused_for': max(0.0, self._resume_at - time.time()),
+                'history': list(self.history),
+            }
+
+    @staticmethod
+    def parse_retry_after(value, now=None):
+        """
+        Seconds to wait, from a Retry-After header value (either a
+        number of seconds or an HTTP date). None if there's no valid value.
+        """
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when is None:
+            return None
+        return max(0.0, when.timestamp() - (now or time.time()))
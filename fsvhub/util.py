@@ -0,0 +1,46 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import html
+import re
+
+class Util(object):
+    @staticmethod
+    def turn_on(checkbox):
+        if not checkbox.is_selected():
+            checkbox.click()
+    @staticmethod
+    def turn_off(checkbox):
+        if checkbox.is_selected():
+            checkbox.click()
+
+    @staticmethod
+    def minify(s):
+        """
+        Remove all but alphanumeric and change to lower-case
+        """
+        return ''.join([i for i in s if i.isalnum()]).lower()
+
+    @staticmethod
+    def minify_html(s):
+        """
+        minify() of the text of HTML s, without its tags, and with
+        entities decoded -- the same for markup an editor has tidied
+        (<b> made <strong>, quotes changed, &nbsp; added...)
+        """
+        return Util.minify(html.unescape(re.sub(r'<[^>]*>', ' ', s)))
+
+    @staticmethod
+    def select_in_dropdown_by_partial_text(select_element, s):
+        """
+        VH uses '...' to indent subcategories in some selects controls
+        """
+        match_found = False
+        for o in select_element.options:
+            # use lstrip() to get rid of leading '...'
+            # use upper() to make this case-insensitive...
+            if o.text.lstrip('.').upper() == s.upper():
+                match_found = True
+                o.click()
+                break
+        if not match_found: # select first element if no match
+            select_element.select_by_index(0)
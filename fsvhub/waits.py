@@ -0,0 +1,80 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import re
+import threading
+
+
+class ElementsMissing(Exception):
+    """
+    Raised by VhBrowser.wait_for_elements() when some of the elements
+    it was waiting for aren't on the page. missing is the list of their
+    locators.
+    """
+    def __init__(self, url, missing, reason):
+        self.url = url
+        self.missing = missing
+        self.reason = reason
+        Exception.__init__(self, "{}: {} missing from {}".format(reason,
+                ', '.join(str(m) for m in missing), url))
+
+
+class LoadTimes(object):
+    """
+    How long each kind of page has taken to be ready, so waits can give
+    up sooner on pages which are normally quick.
+
+    Pages are told apart by URL, less the query string and with runs
+    of digits replaced, so every event's Registered Users page counts as
+    one page. For each, an exponentially weighted moving average of the
+    seconds from goto() until its elements were found is kept; the
+    timeout for the page is factor times that, kept between minimum and
+    maximum. Until a page has been timed, default is used.
+
+    The settings come from the [WAIT] section of the config.
+    """
+    def __init__(self, default=10, minimum=2, maximum=30, factor=3, weight=0.3):
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.weight = weight
+        self._averages = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def from_config(cfg):
+        if not cfg.cfg.has_section('WAIT'):
+            return LoadTimes()
+        w = cfg.cfg['WAIT']
+        return LoadTimes(default=w.getfloat('DEFAULT_TIMEOUT', fallback=10),
+                minimum=w.getfloat('MIN_TIMEOUT', fallback=2),
+                maximum=w.getfloat('MAX_TIMEOUT', fallback=30),
+                factor=w.getfloat('FACTOR', fallback=3),
+                weight=w.getfloat('WEIGHT', fallback=0.3))
+
+    @staticmethod
+    def page_key(url):
+        if url is None:
+            return None
+        return re.sub('[0-9]+', '#', url.split('?')[0].split('#')[0])
+
+    def record(self, url, seconds):
+        key = LoadTimes.page_key(url)
+        if key is None:
+            return
+        with self._lock:
+            average = self._averages.get(key)
+            if average is None:
+                self._averages[key] = seconds
+            else:
+                self._averages[key] = average + self.weight * (seconds - average)
+
+    def average(self, url):
+        with self._lock:
+            return self._averages.get(LoadTimes.page_key(url))
+
+    def timeout(self, url):
+        average = self.average(url)
+        if average is None:
+            return self.default
+        return min(self.maximum, max(self.minimum, self.factor * average))
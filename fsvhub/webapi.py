@@ -0,0 +1,590 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import os.path
+import re
+import threading
+import weakref
+from urllib.parse import urlparse
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import Select
+
+from .util import Util
+
+
+##
+# TODO: Change into Singleton
+##
+class UserApi(object):
+    """
+    There are two ways to find out whether a user exists: download every
+    user over REST once (VhRest.users) and look them up in RAM, or search
+    for each username on the Users page. The download is slow for a large
+    tenant, so it's only worth it for a large batch. Call plan_lookups()
+    with the number of users about to be checked to choose; otherwise
+    user_exists() searches until more than [USER] POINT_LOOKUP_MAX users
+    have been checked, then switches to the download. Either way,
+    answers are remembered for the rest of the run.
+    """
+    def __init__(self, vh_browser):
+        self.vh_browser = vh_browser
+        self.cfg = self.vh_browser.cfg
+        self.point_lookup_max = self.cfg.user.getint('POINT_LOOKUP_MAX', fallback=25)
+        self.bulk_lookups = None    # None: not decided yet
+        self._memo = {}             # username -> user id/edit url, or None
+
+    def logout(self):
+        self.vh_browser.logout()
+
+    def plan_lookups(self, count):
+        """
+        Chooses how user_exists() will work, given that about count
+        users are going to be checked. Returns True if that's by
+        downloading the whole user list.
+        """
+        self.bulk_lookups = count > self.point_lookup_max
+        return self.bulk_lookups
+
+    def user_exists(self, username):
+        """
+        Returns the user's id if user is present (a temporary id, as
+        from VhRest.add_temp_user(), if added during this run); else
+        returns None. For the user's edit page, see find_user_edit_url().
+        """
+        vr = self.vh_browser.vr
+        if vr.users_loaded():
+            return vr.user_id_from_username(username)
+        if username in self._memo:
+            return self._memo[username]
+        if self.bulk_lookups is None and len(self._memo) >= self.point_lookup_max:
+            self.bulk_lookups = True
+        if self.bulk_lookups:
+            return vr.user_id_from_username(username)
+        self._memo[username] = UserApi.user_id_from_edit_url(self.find_user_edit_url(username))
+        return self._memo[username]
+
+    @staticmethod
+    def user_id_from_edit_url(url):
+        """
+        The user id in a user's edit page url (the GUID in it, or else
+        its last path segment); None if url is None.
+        """
+        if url is None:
+            return None
+        m = re.search(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}', url)
+        if m:
+            return m.group(0)
+        return urlparse(url).path.rstrip('/').rsplit('/', 1)[-1]
+
+
+    def select_user_groups(self, group_list):
+        """
+        Assumes that we are on a user add or user edit page.
+        Checks the checkboxes corresponding to the groups in group_list
+        and unchecks all other groups' checkboxes.
+        """
+        # Find list of spans within group manager div:
+        spans = self.vh_browser.find_list_by_css(self.cfg.user['DIV_UG_MGR'] + ' span')
+        # Make a copy of group_list, with each element stripped of leading and trailing spaces,
+        # and converted to upper case...
+        GL = [ v.strip().upper() for v in group_list ]
+        # Now check text of each span against group name in group_list.
+        # Check the corresponding checkboxes of the matches; uncheck
+        # the rest:
+        for s in spans:
+            # Find checkbox controls contained in this span's parent...
+            cb = s.find_element_by_xpath('..').find_element_by_css_selector('input[type="checkbox"')
+            if s.text.strip().upper() in GL:
+                Util.turn_on(cb)
+            else:
+                Util.turn_off(cb)
+
+
+    """
+    Find the url for the edit page for given username.
+    If there is no user with this username, return None
+
+    1. go to http://VOL_HUB_CUSTOMER.volunteerhub.com/Users
+    2. find element id 'q'
+    3. find search button (input type="submit" value="Search")
+    4. type in username and click search button
+    5. look through the result rows for one showing this username
+
+    """
+    def find_user_edit_url(self,username):
+        self.vh_browser.goto(self.cfg.user['SEARCH_URL'])
+        search_field = self.vh_browser.wait_for_element(self.cfg.user['TXT_SEARCH'])
+        if search_field is None:
+            raise Exception("Could not find user search field. Perhaps the page structure has changed.")
+        search_button = self.vh_browser.find_element_by_css(self.cfg.user['BTN_SEARCH'])
+        search_field.clear()
+        search_field.send_keys(username)
+        search_button.click()
+        self.vh_browser.wait_for_element_to_disappear(search_button)
+        self.vh_browser.wait_for_element(self.cfg.user['TXT_SEARCH'])
+        # The search matches names, emails etc. as well as usernames, so
+        # only accept a result whose row shows exactly this username:
+        wanted = username.strip().upper()
+        for link in self.vh_browser.find_list_by_css(self.cfg.user['LNK_SEARCH_RESULT']):
+            row = link.find_element_by_xpath('./ancestor::tr[1]')
+            cells = [ td.text.strip().upper() for td in row.find_elements_by_css_selector('td') ]
+            if wanted in cells:
+                return link.get_attribute('href')
+        return None
+
+    """
+    Adds a user through the Add User page, and records the new username
+    as taken (in this UserApi, and in VhRest's cache if it's loaded).
+    """
+    def add_user(self, data={}):
+        print("add_user called with following data:")
+        print(data)
+        """
+        Assumes VhBrowser (self.vh_browser) is already instantiated
+        data is a dict containing the fields for this user, for example:
+        {  'username': 'joejones23',
+        'fname': 'Joe', 'lname': 'Jones', 'password': 'SuperSecret',
+            'groups': "Team Leaders, Duck-Billed Dinosaurs ],
+            'cell_phone_number': '555-555-5555', 'home_phone_number': '321-555-1212' }
+        Either username or at least one of fname or lname must be given.
+        If username is not given, a username will be constructed by
+        concatenating the first name plus a space plus the last name.
+
+        In any case, the username will be stripped of any trailing or leading
+        spaces before use.
+
+        If the username (whether passed explicitly or constructed from the person's names)
+        already exists, this method will fail, raising Exception('Name already in use.')
+
+        If username, fname, and lname are all omitted the method will raise
+        ValueError("If username is not omitted, at least one of fname or lname must be given.")
+
+        FIELDS SUPPORTED:
+            usernmae
+            password
+            fname
+            lname
+            home_phone_number - phone numbers must have 10 digits
+            cell_phone_number
+            email
+            groups
+        """
+        # First, verify data integrity and determine the username:
+        username = data.get('username','').strip()
+        fname = data.get('fname','').strip()
+        lname = data.get('lname','').strip()
+        if username == '':
+            if fname == '' and lname == '': # Both names either omitted or zero-length
+                raise ValueError("Cannot add user - no username, last name, or first name found.")
+            else:
+                username = (fname + ' ' + lname).strip()
+        # username already in use?
+        if self.user_exists(username):
+            raise Exception("Cannot add user {} - user already exists.".format(username))
+
+        # Go to add user page..
+        self.vh_browser.goto(self.cfg.user['ADD_URL'])
+        # make sure page has loaded by waiting for "save" button...
+        save_button = self.vh_browser.wait_for_element_by_css('input[value="Save User"]')
+        # Get list of input elements on this page:
+        inputs = []
+        try:
+            inputs = self.vh_browser.browser.find_elements_by_tag_name('input')
+        except:
+            raise Exception("No input tags found on page!")
+        # Find username field. If present, put in username:
+        flds = [ i for i in inputs if i.get_attribute('id') == self.cfg.user['TXT_USER_NAME'] ]
+        if len(flds) != 1:
+            raise Exception("Could not find username input field. Perhaps the page structure has changed.")
+        username_field = flds[0]
+        try:
+            username_field.click()
+            username_field.send_keys(username)
+        except:
+            raise Exception("Could not find username input field. Perhaps the page structure has changed.")
+
+        password = data.get('password','')
+        print("Value of password: {}".format(password))
+        if password != '':
+            try:
+                password1_field = [ i for i in inputs if i.get_attribute('id') == self.cfg.user['TXT_PASSWORD'] ][0]
+                password1_field.click()
+                password1_field.send_keys(password)
+            except:
+                raise Exception("Could not find password input field. Perhaps the page structure has changed.")
+            try:
+                password2_field = [ i for i in inputs if i.get_attribute('id') == self.cfg.user['TXT_VERIFY_PASSWORD'] ][0]
+                password2_field.click()
+                password2_field.send_keys(password)
+            except Exception as e:
+                raise e
+        if fname != '':
+            flds = [ i for i in inputs if i.get_attribute('id') == self.cfg.user['TXT_FIRST_NAME'] ]
+            if len(flds) != 1:
+                raise Exception("Could not find first name input field. Perhaps the page structure has changed.")
+            firstname_field = flds[0]
+            try:
+                firstname_field.click()
+                firstname_field.send_keys(fname)
+            except Exception as e:
+                raise e
+
+        if lname != '':
+            try:
+                lastname_field = [ i for i in inputs if i.get_attribute('id') == self.cfg.user['TXT_LAST_NAME'] ][0]
+                lastname_field.click()
+                lastname_field.send_keys(lname)
+            except:
+                raise Exception("Could not find last name input field. Perhaps the page structure has changed.")
+
+        home_number = data.get('home_phone', '')
+        if home_number != '':
+            try:
+                s = "home.*phone.*number"
+                home_prompt = [ p for p in self.vh_browser.find_list_by_css('div.subprompt') if re.search(s,p.text,re.IGNORECASE) ][0]
+                home_container = home_prompt.find_element_by_xpath("following-sibling::*[1]")
+                home_input = home_container.find_element_by_xpath('.//input')
+                home_input.click()
+                home_input.send_keys(home_number)
+            except:
+                raise Exception("Could not find home phone input field. Perhaps the page structure has changed.")
+
+        cell_number = data.get('cell_phone','')
+        if cell_number != '':
+            # Locate cell phone input text field. This
+            # is somewhat indirect!
+            try:
+                s = "cell.*number"
+                cell_prompt = [ p for p in self.vh_browser.find_list_by_css('div.prompt') if re.search(s,p.text,re.IGNORECASE) ][0]
+                cell_container = cell_prompt.find_element_by_xpath("following-sibling::*[2]")
+                cell_input = cell_container.find_element_by_xpath('.//input')
+                cell_input.click()
+                cell_input.send_keys(cell_number)
+            except:
+                raise Exception("Could not find cell phone input field. Perhaps the page structure has changed.")
+
+        groups_to_join = data.get('groups', [])
+        if len(groups_to_join) > 0:
+            self.select_user_groups(groups_to_join)
+
+        save_button.click()
+        # Record that this username is now taken:
+        self._memo[username] = self.vh_browser.vr.add_temp_user(username, groups_to_join)
+        return { 'result': 'user_added: {}'.format(username)}
+
+
+class UserGroupApi(object):
+    def __init__(self,vh_browser):
+        self.vh_browser = vh_browser
+        self.cfg = self.vh_browser.cfg
+        # Load the user groups, unless they're loaded already (say, by
+        # CsvSchema.check()) -- or being loaded, by the warm-up, in which
+        # case this waits for that load:
+        self.vh_browser.vr.user_groups
+
+    def logout(self):
+        self.vh_browser.logout()
+
+    def group_exists(self, group_name):
+        """
+        If user group by this name already exists,
+        return its guid. Otherwise, return None
+        """
+        return self.vh_browser.vr.user_group_id_from_name(group_name)
+
+    def add_group(self, name, description='', parent_name="All Users"):
+        ret_dict = {}
+        # Don't bother if the group already exists...
+        if self.group_exists(name):
+            ret_dict['result'] = 'group_already_there'
+        else:
+            self.vh_browser.goto(self.cfg.user_group['EDIT_URL'])
+            # get our controls...
+            name_field, desc_field, sel_parent, save_button = self.vh_browser.wait_for_elements([
+                    self.cfg.user_group['TXT_GROUP_NAME'], self.cfg.user_group['TXT_DESCRIPTION'],
+                    self.cfg.user_group['SEL_PARENT_GROUP'], self.cfg.user_group['BTN_SAVE'] ])
+            sel_parent = Select(sel_parent)
+            admins_only_radio = self.vh_browser.find_element_by_css(self.cfg.user_group['RB_ADMINS_ONLY'])
+            # fill in name and description...
+            name_field.send_keys(name.strip()) # Remove any leading or trailing spaces
+            desc_field.send_keys(description)
+            # select parent group from drop-down...
+            Util.select_in_dropdown_by_partial_text(sel_parent, parent_name.strip())
+            # select "joinability..."
+            admins_only_radio.click()
+            # save ...
+            save_button.click()
+            # Ask self.vr to mark this name as taken...
+            self.vh_browser.vr.add_temp_user_group(name, parent_name, description)
+            ret_dict['result'] = 'group_successfully_added'
+        return ret_dict
+
+
+"""
+Uses Web automation to interact with VH via
+VhBrowser instance to read and write information
+about landing pages.
+
+One instance per VhBrowser, so each VolunteerHub account (and each
+session of it) has its own landing page catalog, and jobs using
+different browsers never share one. The instance goes away with its
+browser, so a long-running process doesn't collect them.
+"""
+
+class LandingPageApi(object):
+    _instances = weakref.WeakKeyDictionary()    # VhBrowser -> instance
+    _instances_lock = threading.Lock()
+
+    def __new__(cls, vh_browser):
+        with LandingPageApi._instances_lock:
+            instance = LandingPageApi._instances.get(vh_browser)
+            if instance is None:
+                instance = object.__new__(cls)
+                instance._messages = None
+                instance._pages = None
+                # (Not a plain reference, which would keep the browser,
+                # and so this entry, alive.)
+                instance._browser_ref = weakref.ref(vh_browser)
+                instance.cfg = vh_browser.cfg
+                # Set messages through the editor's JavaScript API, rather
+                # than typing them into its HTML source popup:
+                instance.use_editor_api = instance.cfg.landing_page.getboolean('EDITOR_API', fallback=True)
+                LandingPageApi._instances[vh_browser] = instance
+            return instance
+
+    @property
+    def vh_browser(self):
+        return self._browser_ref()
+
+    @classmethod
+    def forget(cls, cfg):
+        """
+        Drops the instances (and their cached page catalogs) for cfg's tenant.
+        """
+        key = cfg.tenant_key()
+        with LandingPageApi._instances_lock:
+            for b in [ b for b in LandingPageApi._instances.keys() if b.cfg.tenant_key() == key ]:
+                del LandingPageApi._instances[b]
+
+    def logout(self):
+        self.vh_browser.logout()
+
+    @property
+    def messages(self):
+        if self._messages is None:
+            self.load_messages()
+        return self._messages
+
+    @property
+    def pages(self):
+        if self._pages is None:
+            self.load_landing_page_list()
+        return self._pages
+
+    """
+    If a landing page with given name already
+    exists, return that page (as a dict); otherwise
+    return None
+    """
+    def page_exists(self, page_name):
+        plist = [ p for p in self.pages if p['name'].upper() == page_name.strip().upper()]
+        if len(plist) == 1:
+            return plist[0]
+        else:
+            return None
+
+    """
+    Load the landing page messages from disk files
+    into RAM.
+    """
+
+    def load_messages(self):
+        msg_dir = self.cfg.landing_page['MSG_STORE_DIR']
+        self._messages = {}
+        for k in self.cfg.landing_page_messages:
+            fname = self.cfg.landing_page_messages[k]
+            path_name = os.path.join(msg_dir,fname)
+            with open(path_name,'r') as infile:
+                # Use cfg key as message dict key, but upper-case:
+                self._messages[k.upper()] = infile.read()
+
+
+    """
+    For each landing page, retrieve its id number, name,
+    and two urls.
+
+    The page: http://VOL_HUB_CUSTOMER.volunteerhub.com/setup/landingpages contains a table
+    with id "LandingPages." Each tr in this table contains either th or td elements. For each
+    row which contains td elements:
+    First td contains an input tag with the "Edit" button. The tag's 'data-href' attribute
+        has a URL, of which the last part (after the last '/') is the id number of the landing page.
+    Second td contains a div which contains the landing page's name as its inner HTML.
+    Third td contains a div which in turn contains a link -- the href of this is the URL for
+        this landing page's QR code.
+    Fourth td contains a div which in turn contains two links -- the href attributes
+        of these links are the absolute URLs of the landing page.
+    """
+    def load_landing_page_list(self):
+        # The list is read through the browser's page cache; copy it,
+        # since add_landing_page() appends to self._pages.
+        self._pages = list(self.vh_browser.read_page(self.cfg.landing_page['LIST_URL'],
+                harvest=self.scrape_landing_page_list,
+                ready_id=self.cfg.landing_page['LIST_DONE_MARKER']))
+
+    def scrape_landing_page_list(self, vh_browser):
+        # Locate the table containing the landing page data...
+        lp_table = vh_browser.find_element_by_css(self.cfg.landing_page['LIST_TABLE_CSS'])
+        pages = []
+        trlist = lp_table.find_elements_by_css_selector('tr')
+        # The first tr in the table is the header row, consisting
+        # of th elements. The rest of them should each contain
+        # four td elements, of which the first, second and fourth
+        # have the info we want.
+        for tr in trlist:
+            tdlist = tr.find_elements_by_css_selector('td')
+            if tdlist and len(tdlist) == 4:
+                scratch = {}
+                # In first td, page id number is at end of url...
+                a = tdlist[0].find_element_by_css_selector('input')
+                lpid = a.get_attribute('data-href').split('/')[-1]
+                scratch['id'] = lpid
+                # innerHTML of second td is the name of the page.
+                d = tdlist[1].find_element_by_css_selector('div')
+                inner_html = d.get_attribute('innerHTML')
+                if inner_html is None:
+                    inner_html = ''
+                scratch['name'] = inner_html.strip()
+                # Fourth td has anchor elements (probably two of them,
+                # but let's not assume) containing links to the page.
+                alist = tdlist[3].find_elements_by_css_selector('a')
+                for i,a in enumerate(alist):
+                    key = 'url' + str(i)
+                    # Key is 'url0' 'url1' and so on.
+                    scratch[key] = a.get_attribute('href')
+                pages.append(scratch)
+        return pages
+
+    def add_landing_page(self, org_name, team_name, page_name='', event_group='All Events'):
+        self.vh_browser.goto(self.cfg.landing_page['EDIT_URL'])
+        # get page elements, all in one wait (this raises ElementsMissing,
+        # naming them, if any aren't there)...
+        lp = self.cfg.landing_page
+        (txt_page_name, txt_subhost, txt_url, sel_event_group, sel_user_group,
+                chk_user_group, chk_autojoin, chk_override_look, chk_override_msg,
+                btn_save_page) = self.vh_browser.wait_for_elements([
+                    lp['TXT_PAGE_NAME'], lp['TXT_SUBHOST'], lp['TXT_URL'],
+                    lp['SEL_EVENT_GROUP'], lp['SEL_USER_GROUP'],
+                    lp['CHK_USER_GROUP_FILTER'], lp['CHK_AUTOJOIN'],
+                    lp['CHK_OVERRIDE_LOOK'], lp['CHK_OVERRIDE_MSG'],
+                    (By.CSS_SELECTOR, lp['BTN_SAVE_PAGE']) ])
+        sel_event_group = Select(sel_event_group)
+        sel_user_group = Select(sel_user_group)
+        # Fill in some values:
+        txt_page_name.clear()
+        # generate page name if not passed.
+        # TODO: Add logic to differentiate among "Corporate Group," "Family Group,"
+        # and other parents of our parent group.
+        # TODO: Add check for maximum allowable page name length.
+        if page_name == '':
+            page_name = 'X - ' + org_name
+        txt_page_name.send_keys(page_name)
+        u = Util.minify(page_name)
+        txt_subhost.clear()
+        txt_subhost.send_keys(u)
+        txt_url.clear()
+        txt_url.send_keys(u)
+        # Check some boxes, select from some drop-downs:
+        Util.select_in_dropdown_by_partial_text(sel_event_group, event_group)
+        Util.select_in_dropdown_by_partial_text(sel_user_group, team_name)
+        Util.turn_on(chk_user_group)
+        Util.turn_on(chk_autojoin)
+        Util.turn_off(chk_override_look)
+        Util.turn_on(chk_override_msg)
+        # Put in message html...
+        self.insert_lp_messages(org_name, save_old_messages=False)
+        # Save our work...
+        btn_save_page.click()
+        # The landing page list has changed. Record the new page in our
+        # copy, so page_exists() knows about it without reloading the list:
+        self.vh_browser.invalidate_pages(re.escape(self.cfg.landing_page['LIST_URL']))
+        if self._pages is not None:
+            self._pages.append({ 'id': None, 'name': page_name })
+
+    def prepare_message(self, msg_name, org_name):
+        m = self.messages[msg_name]
+        if not m:
+            return ''
+        m = m.replace('\t','') # html editor doesn't like tabs for some reason
+        if org_name is not None:
+            m = m.replace('###ORG NAME###', org_name)
+        return m
+
+    def set_editor_content(self, msg_name, html):
+        """
+        Puts html into one of the message editors through the rich-text
+        editor's JavaScript API, without opening its HTML source popup.
+        The editor's id is the IFR_<msg_name>_HTML iframe id less its
+        '_ifr' suffix. Returns True if the content was set and copied
+        back to the form field the page saves; False if there's no
+        editor API, so it has to be done the slow way. The stored content
+        is checked against html (see Util.minify_html()), and set again
+        if it differs; raises an exception if it still differs.
+        """
+        key = 'IFR_' + msg_name + '_HTML'
+        if key not in self.cfg.landing_page:
+            return False
+        editor_id = re.sub('_ifr$', '', self.cfg.landing_page[key])
+        for attempt in range(2):
+            result = self.vh_browser.browser.execute_script("""
+                var ed = window.tinymce && tinymce.get(arguments[0]);
+                if (!ed) {
+                    return null;
+                }
+                ed.setContent(arguments[1]);
+                ed.save();
+                var field = document.getElementById(arguments[0]);
+                return { content: ed.getContent(), stored: field ? field.value : null };
+                """, editor_id, html)
+            if result is None:
+                print("No editor API for {}; using the HTML source popup".format(msg_name))
+                return False
+            # The editor tidies the html, so it won't match exactly; compare
+            # the text of what the form field will save with what was meant.
+            if result['stored'] is not None and Util.minify_html(result['stored']) == Util.minify_html(html):
+                return True
+            print("Editor did not keep {} message{}".format(msg_name, '; trying again' if attempt == 0 else ''))
+        raise Exception("Could not set {} message: the editor stored {!r}".format(msg_name, result['stored']))
+
+    def insert_lp_message(self,msg_name,org_name, save_old_message):
+        """
+        Assumes that we're already on the editing screen for
+        this landing page and that the "Override the default
+        messages" has been clicked.
+        """
+        if save_old_message:
+            raise Exception("Save old message not yet implemented.")
+        m = self.prepare_message(msg_name, org_name)
+        if self.use_editor_api and self.set_editor_content(msg_name, m):
+            return
+        # Save breadcrumb...
+        self.vh_browser.save_window_handle()
+        html_link_css = self.cfg.landing_page['LNK_' + msg_name + '_HTML']
+        html_link = self.vh_browser.find_element_by_css(html_link_css)
+        html_link.click()
+        # Now switch to HTML Source Editor window which just popped up:
+        self.vh_browser.switch_to_newest_window()
+        # Wait until html source area is ready...
+        source_area = self.vh_browser.wait_for_element(self.cfg.landing_page['TXT_HTML_SOURCE'])
+        source_area.clear()
+        ## Now insert message into text area:
+        if len(m) > 0:
+            source_area.send_keys(m)
+        ## Find and click 'Update' button:
+        update_button = self.vh_browser.find_element_by_css(self.cfg.landing_page['BTN_SAVE_HTML'])
+        update_button.click()
+        ## Switch back to main window:
+        self.vh_browser.return_to_previous_window()
+
+    def insert_lp_messages(self,org_name=None, save_old_messages=False):
+        for k in self.messages.keys():
+            self.insert_lp_message(k,org_name,save_old_messages)
@@ -3,62 +3,132 @@
 # Read reservation expirations for VH events.
 # For each one, print event id and value of reservation expiration drop-down select.
 #
-# Uses built-in re and sys modules.
+# usage: list_event_expirations.py [--via-daemon] username password [format [tabs]]
 #
-# Uses selenium (third party, available via PyPi
+# format is one of:
+#	text -- "event id: expiration" lines (the default)
+#	csv -- CSV with a header row
+#	json -- one JSON object per line
+#
+# The expirations come from the events REST API. Only events whose API
+# data doesn't include them are read from their "Registered Users"
+# pages in the browser; those pages are loaded several at a time, in
+# tabs (default 4). Rows are written as soon as they are known.
+#
+# With --via-daemon, the report is run by vhdaemon.py instead.
+#
+# Uses built-in csv, itertools, json and sys modules.
+#
+# Uses selenium (third party, available via PyPi), only if some
+# expirations are missing from the API data.
 #
 # Uses fsvhub and config file vhconfig.cfg
 #
 # This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
 
 
-import re
+import csv
+import itertools
+import json
 import sys
 
-from selenium.webdriver.support.ui import Select
-from fsvhub import VhConfig, VhBrowser
+from fsvhub import VhConfig, VhRest
+from fsvhub.daemon import submit_job, via_daemon
+
+FIELDS = [ 'event_id', 'event_name', 'start', 'user_group', 'expiration', 'source' ]
+
+class RowWriter(object):
+	def __init__(self, fmt, outfile):
+		self.fmt = fmt
+		self.outfile = outfile
+		if fmt == 'csv':
+			self.writer = csv.DictWriter(outfile, fieldnames=FIELDS)
+			self.writer.writeheader()
+
+	def write(self, row):
+		if self.fmt == 'csv':
+			self.writer.writerow(row)
+		elif self.fmt == 'json':
+			self.outfile.write(json.dumps(row) + '\n')
+		else:
+			self.outfile.write("{}: {}\n".format(row['event_id'], row['expiration']))
+		# Stream -- don't hold rows back in the buffer:
+		self.outfile.flush()
 
-if len(sys.argv) != 3:
-	print("You must supply a user name and password. If either one contains spaces, you must use quotes around it.")
-	sys.exit(1)
-	
-user = sys.argv[1]
-password = sys.argv[2]
-c = VhConfig(user,password,config_file='vhconfig.cfg')
-b = VhBrowser(c)
-index_url = c.event['INDEX_URL']
-summ_url = c.event['SUMMARY_URL']
-reg_users_url = c.event['REG_USERS_URL']
-patt=re.compile(c.event['SEL_EXPIRATION_REGEX'])
+def scrape_expirations(c, event_ids, tabs, out, b=None):
+	# Imported here, so REST-only runs don't load selenium:
+	from fsvhub import VhBrowser, TabPool
+	# A browser passed in (by the daemon) is left logged in.
+	own_browser = b is None
+	if own_browser:
+		b = VhBrowser(c.username,c.password)
+	reg_users_url = c.event['REG_USERS_URL']
+	# Anchor the pattern, to match the way re.match() was used before:
+	patt = '^(?:' + c.event['SEL_EXPIRATION_REGEX'] + ')'
 
-b.goto(index_url)
-# Give page time to load
-b.wait_for_element('Footer')
+	def read_expirations(vh_browser):
+		return vh_browser.selected_options(patt)
 
-# list of all links on page
-all_links = b.find_list_by_css('a')
-# Filter for those linking to events...
-event_links = [ l for l in all_links if l.get_attribute('href') and 
-	l.get_attribute('href').startswith(summ_url) ]
+	urls = [ reg_users_url + str(eid) for eid in event_ids ]
+	try:
+		pool = TabPool(b, size=tabs)
+		try:
+			for url, expirations in pool.map(urls, c.event['BTN_SAVE_REGISTRATION'], read_expirations):
+				eid = url[len(reg_users_url):]
+				if expirations is None:
+					sys.stderr.write("{}: page did not load\n".format(eid))
+					continue
+				for row in VhRest.page_expiration_rows(eid, event_ids[eid], expirations):
+					out.write(row)
+		finally:
+			# Don't leave tabs open in a long-lived (daemon's) browser:
+			pool.close()
+	finally:
+		if own_browser:
+			b.logout()
 
-# Get list of event ids...
-event_ids = [ l.get_attribute('href').split('=')[-1] for l in event_links ]
+def report_expirations(c, vr, fmt, tabs, out, b=None):
+	out = RowWriter(fmt, out)
+	# event id -> its API rows, for events the API has no (or incomplete) expiration data for:
+	missing = {}
+	# Rows come grouped by event; an event is either reported entirely
+	# from the API, or entirely from its page.
+	for eid, rows in itertools.groupby(vr.expiration_report(), key=lambda r: r['event_id']):
+		rows = list(rows)
+		if [ r for r in rows if r['expiration'] is None ]:
+			missing[str(eid)] = rows
+			continue
+		for row in rows:
+			row['source'] = 'api'
+			out.write(row)
+	if missing:
+		scrape_expirations(c, missing, tabs, out, b)
 
-# For each event id, open that event's "Registered Users" page, get a list of all 'select' tags, then
-# narrow that list to only those with an id that matches our regex.
-for eid in event_ids:
-	b.goto( reg_users_url + eid)
-	b.wait_for_element(c.event['BTN_SAVE_REGISTRATION'])
-	
-	all_sel_tags = b.find_list_by_css('select')
-	expiration_sel_tags = [ t for t in all_sel_tags
-		if patt.match(t.get_attribute('id')) ]
+def run_job(b, args):
+	"""
+	Reports expirations in optional format args[0], reading pages in
+	args[1] tabs, using VhBrowser b, for vhdaemon.py.
+	"""
+	fmt = args[0] if len(args) > 0 else 'text'
+	tabs = int(args[1]) if len(args) > 1 else 4
+	report_expirations(b.cfg, b.vr, fmt, tabs, sys.stdout, b)
 
-	# For each expiration_sel_tag, print the event id and the selected text...
-	for sel_tag in expiration_sel_tags:
-		# Wrap select tag in a selenium Select object...
-		sel = Select(sel_tag)
-		t = sel.first_selected_option.text
-		print("{}: {}".format(eid,t))
+def main():
+	argv = via_daemon(sys.argv)
+	if len(argv or sys.argv) < 3 or len(argv or sys.argv) > 5:
+		print("Usage: {} [--via-daemon] username password [text|csv|json [tabs]]".format(sys.argv[0]))
+		print("\tAny item containing spaces must be quoted.")
+		sys.exit(1)
+	if argv is not None:
+		ok = submit_job('list_expirations', argv[1], argv[2], argv[3:])
+		sys.exit(0 if ok else 1)
+	user = sys.argv[1]
+	password = sys.argv[2]
+	fmt = sys.argv[3] if len(sys.argv) > 3 else 'text'
+	tabs = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+	c = VhConfig(user,password,config_file='vhconfig.cfg')
+	vr = VhRest(c)
+	report_expirations(c, vr, fmt, tabs, sys.stdout)
 
-b.logout()
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+# Does several things to each event's "Registered Users" page in one
+# visit per event, saving each page at most once.
+#
+# usage: sweep_events.py [--via-daemon] username password operations [startdate [enddate]]
+# example: sweep_events.py "joe smith" secret clear_overflow,read_expirations=csv 2016-04-02T00:00 2016-06-30T00:00
+#
+# operations is a comma-separated list of:
+#	clear_overflow -- clear the "Allow Overflow" checkboxes (as
+#		clear_overflow_checkboxes_in_events.py does, sharing its record
+#		of events already swept)
+#	set_lead_time=TEXT -- set every reservation expiration drop-down
+#		to the option TEXT
+#	read_expirations[=FORMAT] -- print each registration's reservation
+#		expiration, as it was before any changes; FORMAT is text (the
+#		default), csv or json, as for list_event_expirations.py
+#
+# The events come from the REST API. With --via-daemon, the sweep is run
+# by vhdaemon.py instead.
+#
+# Uses built-in datetime and sys modules.
+#
+# Uses selenium (third party, available via PyPi)
+#
+# Uses fsvhub and config file vhconfig.cfg
+#
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import datetime
+import sys
+
+from fsvhub import LocalState, VhBrowser
+from fsvhub.daemon import submit_job, via_daemon
+from fsvhub.sweep import ClearOverflow, EventSweep, ReadExpirations, SetLeadTimes
+from list_event_expirations import RowWriter
+
+DATE_PATTERN = '%Y-%m-%dT%H:%M'
+
+def make_operations(b, spec):
+	ops = []
+	for item in spec.split(','):
+		name, sep, arg = item.strip().partition('=')
+		if name == 'clear_overflow':
+			ops.append(ClearOverflow(b.cfg, LocalState.for_tenant(b.cfg, 'overflow_sweep')))
+		elif name == 'set_lead_time' and arg:
+			ops.append(SetLeadTimes(b.cfg, arg))
+		elif name == 'read_expirations':
+			ops.append(ReadExpirations(b.vr, RowWriter(arg or 'text', sys.stdout).write))
+		else:
+			raise Exception("Unknown operation {}".format(item))
+	return ops
+
+def run_job(b, args):
+	"""
+	Sweeps with operations args[0], over the events between optional
+	dates args[1] and args[2], using VhBrowser b, for vhdaemon.py.
+	"""
+	ops = make_operations(b, args[0])
+	start = datetime.datetime.strptime(args[1], DATE_PATTERN) if len(args) > 1 else None
+	end = datetime.datetime.strptime(args[2], DATE_PATTERN) if len(args) > 2 else None
+	events = b.vr.events_between(start, end)
+	print("{} events in range".format(len(events)))
+	counts = EventSweep(b, ops).run(events)
+	print("{visited} visited, {saved} saved, {skipped} skipped, {failed} failed".format(**counts))
+
+def main():
+	argv = via_daemon(sys.argv)
+	if len(argv or sys.argv) < 4 or len(argv or sys.argv) > 6:
+		print("Usage: {} [--via-daemon] username password operations [startdate [enddate]]".format(sys.argv[0]))
+		print("\tAny item containing spaces must be quoted.")
+		sys.exit(1)
+	if argv is not None:
+		ok = submit_job('sweep', argv[1], argv[2], argv[3:])
+		sys.exit(0 if ok else 1)
+	b = VhBrowser(sys.argv[1], sys.argv[2])
+	try:
+		run_job(b, sys.argv[3:])
+	finally:
+		b.logout()
+
+if __name__ == '__main__':
+	main()
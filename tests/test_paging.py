@@ -0,0 +1,73 @@
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import json
+import os.path
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fsvhub import LocalState, VhConfig, VhRest
+
+
+class FakeResponse(object):
+    def __init__(self, content):
+        self.content = content
+        self.status_code = 200
+        self.headers = {}
+
+
+class PagedApiTest(unittest.TestCase):
+    """
+    get_vh_list() against a fake paged API of n records, optionally
+    serving at most cap records per page whatever pageSize is asked for.
+    """
+    def pull(self, n, cap=None):
+        cfg = VhConfig('paging-test-{}-{}'.format(n, cap), 'x', config_file=os.path.join(ROOT, 'vhconfig.cfg'))
+        VhRest.forget(cfg)
+        vr = VhRest(cfg)
+        self.addCleanup(VhRest.forget, cfg)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        sizer = vr.page_sizer
+        sizer.adaptive = True
+        sizer.state = LocalState(os.path.join(tmp.name, 'page_sizes.json'))
+        records = list(range(n))
+        calls = []
+        def http_get(api_call, params=None):
+            size, page = params['pageSize'], params['page']
+            calls.append((size, page))
+            served = min(size, cap or size)
+            return FakeResponse(json.dumps(records[page * size:page * size + served]).encode('utf-8'))
+        vr.http_get = http_get
+        got = []
+        vr.get_vh_list(api_call='v2/users', data={}, func=got.append)
+        self.assertEqual(got, records)
+        return calls, sizer.state.get('v2/users')
+
+    def test_207_records(self):
+        calls, saved = self.pull(207)
+        # No pages smaller than the base size:
+        self.assertTrue(min(size for size, page in calls) >= 50, calls)
+        self.assertTrue(len(calls) <= 6, calls)
+        self.assertEqual(saved, 100)
+
+    def test_1007_records(self):
+        calls, saved = self.pull(1007)
+        self.assertTrue(min(size for size, page in calls) >= 50, calls)
+        self.assertTrue(len(calls) <= 8, calls)
+        # The biggest size which came back full, not a refetch's:
+        self.assertEqual(saved, 400)
+
+    def test_capped_at_100(self):
+        calls, saved = self.pull(1007, cap=100)
+        self.assertEqual(saved, 100)
+        # Once the cap is found, no more pages bigger than it:
+        first_capped = calls.index((200, 1))
+        self.assertTrue(all(size <= 100 for size, page in calls[first_capped + 1:]), calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
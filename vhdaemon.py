@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+#
+# Runs the VolunteerHubWrapper session daemon, which keeps logged-in
+# browsers and warm caches between jobs. Jobs are submitted by running
+# the other scripts with the --via-daemon option, for example:
+#
+#	vhdaemon.py &
+#	do_transactions_from_csv.py --via-daemon "joe smith" secret batch1.csv
+#	do_transactions_from_csv.py --via-daemon "joe smith" secret batch2.csv
+#
+# usage: vhdaemon.py [socketpath]
+#
+# The socket path defaults to [DAEMON] SOCKET in vhconfig.cfg, or the
+# VHW_DAEMON_SOCKET environment variable if that is set. Run the daemon
+# (and the scripts) from the directory containing vhconfig.cfg.
+#
+# Uses selenium and pyvirtualdisplay (third party, available via PyPi)
+#
+# Uses fsvhub and config file vhconfig.cfg
+#
+# This file and other files that are part of VolunteerHubWrapper are Copyright © 2018 by Tony Rein
+
+import sys
+
+from fsvhub.daemon import VhDaemon, default_socket_path
+
+def main():
+	socket_path = sys.argv[1] if len(sys.argv) > 1 else default_socket_path()
+	print("Listening on {}".format(socket_path))
+	d = VhDaemon(socket_path)
+	try:
+		d.serve_forever()
+	except KeyboardInterrupt:
+		pass
+
+if __name__ == '__main__':
+	main()